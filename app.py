@@ -1,48 +1,476 @@
 # app.py - Flask веб-приложение для UVM
 from flask import Flask, render_template, request, jsonify, send_file, Response
 import io
+from itertools import islice
 import traceback
 import os
+import hashlib
+import threading
+import time
+import zlib
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor, TimeoutError as FuturesTimeoutError
 import uvm_asm
+from uvm_memory import ADDR_SPACE, PagedMemory
 
 # Проверяем импорт модулей
 try:
-    from uvm_asm import assemble_text as asm_assemble_text
+    from uvm_asm import IncrementalAssembler, ExpansionLimitError, expand_program
+    from uvm_disasm import disassemble_page
 
     ASSEMBLER_AVAILABLE = True
 except Exception:
     ASSEMBLER_AVAILABLE = False
-    asm_assemble_text = None
+    IncrementalAssembler = None
+    ExpansionLimitError = RuntimeError
+    expand_program = None
+    disassemble_page = None
 
 try:
-    from uvm_interp import execute as interp_execute
+    from uvm_interp import execute_limited, ExecutionLimitError, Profiler
+    from uvm_interp import CheckpointExecutor, run_with_checkpoints
 
     INTERPRETER_AVAILABLE = True
 except Exception:
     INTERPRETER_AVAILABLE = False
-    interp_execute = None
+    execute_limited = None
+    Profiler = None
+    CheckpointExecutor = None
+    run_with_checkpoints = None
+    ExecutionLimitError = RuntimeError
 
 app = Flask(__name__)
 
+# Лимит кэша результатов (начало байткода + превью IR + образ памяти)
+CACHE_MAX_BYTES = 64 * 1024 * 1024
+IR_PREVIEW_LINES = 200
+# Байткод дальше этого не показывается в hex; целиком он кодируется только в /api/save_binary
+HEX_PREVIEW_BYTES = 4096
+
+# Лимиты выполнения в пуле процессов
+EXEC_WORKERS = os.cpu_count() or 2
+EXEC_QUEUE_DEPTH = 16
+EXEC_MAX_INSTRUCTIONS = 5000000
+EXEC_TIME_LIMIT = 10.0
+# Развертка директив (.repeat, .macro) идет в том же пуле и со своим лимитом времени
+ASSEMBLE_TIME_LIMIT = 10.0
+
+# Профилирование по запросу (profile: true)
+PROFILE_TRACE_SIZE = 32
+PROFILE_TOP = 10
+
+# Снимки памяти для повторных запусков после правки (на одну сессию)
+SESSION_CHECKPOINT_INTERVAL = 65536
+SESSION_CHECKPOINT_BUDGET = 8 * 1024 * 1024
+
+# Постраничная выдача дампа памяти
+DUMP_PAGE_SIZE = 256
+DUMP_MAX_LIMIT = 5000
+CSV_ROWS_PER_CHUNK = 4096
+
+# Лимиты хранилища сессий
+SESSION_TTL = 30 * 60
+SESSION_MAX_ENTRIES = 10000
+# Суммарный размер сессий; сверх него у давно не использованных сессий
+# сбрасываются ассемблер и снимки памяти (результат и текст программы остаются)
+SESSION_MAX_BYTES = 256 * 1024 * 1024
+
 
 # Состояние сессии (в реальном приложении используйте сессии или базу данных)
 class SessionState:
-    def __init__(self):
-        self.bytecode = None
-        self.IR = None
-        self.memory = None
-        self.program_text = ""
+    def __init__(self, session_id=None):
+        self.session_id = session_id
+        self.result_key = None
+        self.mem_size = ADDR_SPACE
+        self._program = b""
+        # Программа (сжатая) и размер памяти, давшие result_key: после неудачного
+        # ассемблирования save_binary, save_dump и /api/dump отдают последний удачный результат
+        self._result_program = b""
+        self.result_mem_size = ADDR_SPACE
         self.dump_range = "0-127"
+        self.last_access = time.monotonic()
+        # Инкрементальный ассемблер: после правки перекодируются только измененные строки
+        self.assembler = None
+        # Снимки памяти: после правки выполнение продолжается с ближайшего снимка
+        self.executor = None
+        # nbytes() на момент последнего SessionStore.account
+        self.size = 0
+        self.lock = threading.RLock()
+
+    # Текст программы хранится сжатым
+    @property
+    def program_text(self):
+        return zlib.decompress(self._program).decode('utf-8') if self._program else ""
+
+    @program_text.setter
+    def program_text(self, text):
+        self._program = zlib.compress(text.encode('utf-8')) if text else b""
+
+    @property
+    def result_program_text(self):
+        return zlib.decompress(self._result_program).decode('utf-8') if self._result_program else ""
+
+    def remember_result(self, key):
+        # Сжатый текст не копируется: это тот же объект, что и _program
+        self.result_key = key
+        self._result_program = self._program
+        self.result_mem_size = self.mem_size
+
+    def assemble(self, program_text=None):
+        """(ProgramIR, превью IR, число инструкций) текущей программы (или program_text).
+
+        ProgramIR меняется при следующем ассемблировании, поэтому пользоваться им нужно под self.lock.
+        """
+        with self.lock:
+            if self.assembler is None:
+                # .repeat может развернуться в сколь угодно длинную программу - ограничиваем сразу
+                # и разворачиваем не в потоке запроса, а в пуле процессов
+                self.assembler = IncrementalAssembler(EXEC_MAX_INSTRUCTIONS, ASSEMBLE_TIME_LIMIT,
+                                                      expand_in_pool)
+            self.assembler.update(self.program_text if program_text is None else program_text)
+            ir_preview = "\n".join(str(x) for x in self.assembler.ir_preview(IR_PREVIEW_LINES))
+            return self.assembler.program, ir_preview, self.assembler.count
+
+    def checkpoint_executor(self, mem_size):
+        if self.executor is None or self.executor.mem_size != mem_size:
+            self.executor = CheckpointExecutor(mem_size, SESSION_CHECKPOINT_INTERVAL,
+                                               SESSION_CHECKPOINT_BUDGET)
+        return self.executor
+
+    def release_caches(self):
+        # Восстанавливаются при следующем запуске: полное ассемблирование и выполнение с начала
+        self.assembler = None
+        self.executor = None
+
+    def nbytes(self):
+        assembler_bytes = self.assembler.nbytes() if self.assembler is not None else 0
+        executor_bytes = self.executor.nbytes() if self.executor is not None else 0
+        result_program_bytes = len(self._result_program) if self._result_program is not self._program else 0
+        return (len(self._program) + result_program_bytes + len(self.dump_range) + assembler_bytes + executor_bytes
+                + (len(self.result_key) if self.result_key else 0))
+
+
+# Результат ассемблирования и выполнения одной программы
+class CachedResult:
+    def __init__(self, bytecode_head, bytecode_size, ir_preview, instructions, memory_image, mem_size):
+        self.bytecode_head = bytecode_head
+        self.bytecode_size = bytecode_size
+        self.ir_preview = ir_preview
+        self.instructions = instructions
+        self.mem_size = mem_size
+        # Храним только тронутые страницы памяти, каждую сжатой zlib
+        self.memory_image = {n: zlib.compress(raw) for n, raw in memory_image.items()}
+        self.profile = None
+
+    def memory(self):
+        image = {n: zlib.decompress(raw) for n, raw in self.memory_image.items()}
+        return PagedMemory.from_image(image, self.mem_size)
+
+    def nbytes(self):
+        image_bytes = sum(len(raw) for raw in self.memory_image.values())
+        return len(self.bytecode_head) + len(self.ir_preview) + image_bytes
+
+
+# LRU-кэш результатов, ограниченный суммарным размером записей
+class ResultCache:
+    def __init__(self, max_bytes=CACHE_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self.entries = OrderedDict()
+        self.bytes_held = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.lock = threading.Lock()
+
+    def get(self, key):
+        with self.lock:
+            result = self.entries.get(key)
+            if result is None:
+                self.misses += 1
+                return None
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return result
+
+    def put(self, key, result):
+        size = result.nbytes()
+        if size > self.max_bytes:
+            return
+        with self.lock:
+            old = self.entries.pop(key, None)
+            if old is not None:
+                self.bytes_held -= old.nbytes()
+            self.entries[key] = result
+            self.bytes_held += size
+            while self.bytes_held > self.max_bytes:
+                _, evicted = self.entries.popitem(last=False)
+                self.bytes_held -= evicted.nbytes()
+                self.evictions += 1
+
+    def stats(self):
+        with self.lock:
+            return {
+                'entries': len(self.entries),
+                'bytes_held': self.bytes_held,
+                'max_bytes': self.max_bytes,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions
+            }
+
+
+result_cache = ResultCache()
+
+
+class ServerBusyError(RuntimeError):
+    pass
+
 
+def execute_job(bytecode, mem_size, max_instructions, time_limit, profile=False, resume=None, interval=None):
+    """Выполняется в рабочем процессе: запуск байткода с лимитами.
 
-# Простая база данных сессий (для демо, в продакшене используйте Redis и т.д.)
-sessions = {}
+    resume = (индекс, смещение, образ памяти) - продолжить с готового снимка;
+    тогда возвращаются и новые снимки: (образ памяти, профиль, снимки).
+    """
+    if resume is not None:
+        index, offset, image = resume
+        memory = PagedMemory.from_image(image, mem_size)
+        checkpoints = run_with_checkpoints(bytecode, memory, index, offset, interval,
+                                           max_instructions, time_limit, image)
+        return memory.to_image(), None, checkpoints
+    profiler = Profiler(PROFILE_TRACE_SIZE) if profile else None
+    memory = execute_limited(bytecode, mem_size, max_instructions, time_limit, profiler=profiler)
+    report = profiler.report(PROFILE_TOP) if profiler is not None else None
+    return memory.to_image(), report, None
+
+
+# Пул процессов и ограничение очереди: не больше EXEC_WORKERS + EXEC_QUEUE_DEPTH задач одновременно
+exec_pool = ProcessPoolExecutor(max_workers=EXEC_WORKERS)
+exec_slots = threading.BoundedSemaphore(EXEC_WORKERS + EXEC_QUEUE_DEPTH)
+
+
+def run_in_pool(fn, *args):
+    if not exec_slots.acquire(blocking=False):
+        raise ServerBusyError('Execution queue is full, try again later.')
+    try:
+        future = exec_pool.submit(fn, *args)
+    except Exception:
+        exec_slots.release()
+        raise
+    future.add_done_callback(lambda f: exec_slots.release())
+    try:
+        # Время ожидания включает очередь, поэтому берем лимит с запасом
+        return future.result(timeout=2 * EXEC_TIME_LIMIT)
+    except FuturesTimeoutError:
+        future.cancel()
+        raise ExecutionLimitError(f"Time limit of {EXEC_TIME_LIMIT:g}s exceeded (job queued or running too long)")
+
+
+def submit_job(bytecode, mem_size, profile=False, resume=None, interval=None):
+    return run_in_pool(execute_job, bytecode, mem_size, EXEC_MAX_INSTRUCTIONS, EXEC_TIME_LIMIT,
+                       profile, resume, interval)
+
+
+def expand_in_pool(lines, max_instructions, time_limit, check=None):
+    # Развертка директив для IncrementalAssembler: в потоке запроса только ожидание.
+    # check (отмена) в другой процесс не передается - там действует лимит времени
+    return run_in_pool(expand_program, lines, max_instructions, time_limit)
+
+
+def normalize_program(text):
+    # Пустые строки, комментарии и лишние пробелы не влияют на результат
+    lines = []
+    for raw in text.splitlines():
+        s = raw.strip()
+        if not s or s.startswith('#') or s.startswith('//'):
+            continue
+        lines.append(" ".join(s.split()))
+    return "\n".join(lines)
+
+
+def program_key(program_text, mem_size):
+    h = hashlib.sha256(normalize_program(program_text).encode('utf-8'))
+    h.update(f"\0{mem_size}".encode('ascii'))
+    return h.hexdigest()
+
+
+def run_program(session, profile=False, program_text=None, mem_size=None):
+    """Возвращает (key, CachedResult, hit) для программы сессии, выполняя ее только при промахе кэша.
+
+    program_text и mem_size по умолчанию берутся из сессии.
+    Ассемблирование идет в потоке запроса через инкрементальный ассемблер сессии,
+    выполнение - в пуле процессов, начиная с ближайшего снимка памяти сессии.
+    Если нужен профиль, а в кэше результат без него, программа выполняется заново целиком.
+    """
+    if program_text is None:
+        program_text = session.program_text
+    if mem_size is None:
+        mem_size = session.mem_size
+    key = program_key(program_text, mem_size)
+    result = result_cache.get(key)
+    if result is not None and (not profile or result.profile is not None):
+        return key, result, True
+
+    with session.lock:
+        try:
+            program, ir_preview, instructions = session.assemble(program_text)
+            if instructions > EXEC_MAX_INSTRUCTIONS:
+                raise ExecutionLimitError(f"Program has {instructions} instructions, limit is {EXEC_MAX_INSTRUCTIONS}")
+            # В пул уходят столбцы IR, а не байткод: рабочему процессу не нужно декодировать
+            if profile:
+                memory_image, report, _ = submit_job(program, mem_size, profile)
+            else:
+                executor = session.checkpoint_executor(mem_size)
+                resume = executor.prepare(program)
+                memory_image, report, checkpoints = submit_job(program, mem_size, resume=resume,
+                                                               interval=executor.interval)
+                executor.commit(checkpoints)
+            # Для hex-вида кодируется только начало; размер считается без кодирования
+            bytecode_head = program.head(HEX_PREVIEW_BYTES)
+            bytecode_size = len(program)
+        except ExpansionLimitError as ex:
+            raise ExecutionLimitError(str(ex)) from None
+        finally:
+            # Ассемблер и снимки памяти сессии могли вырасти
+            sessions.account(session)
+    result = CachedResult(bytecode_head, bytecode_size, ir_preview, instructions, memory_image, mem_size)
+    result.profile = report
+    result_cache.put(key, result)
+    return key, result, False
+
+
+def session_result(session):
+    """CachedResult для session.result_key - последнего удачного /api/assemble.
+
+    При промахе кэша заново выполняется та программа, что дала result_key,
+    а не текущий текст сессии (он мог не ассемблироваться).
+    """
+    result = result_cache.get(session.result_key)
+    if result is None:
+        _, result, _ = run_program(session, program_text=session.result_program_text,
+                                   mem_size=session.result_mem_size)
+    return result
+
+
+def parse_dump_range(dump_range):
+    try:
+        s, e = map(int, dump_range.split("-", 1))
+    except Exception:
+        s, e = 0, 127
+    return s, e
+
+
+def dump_page(memory, s, e, offset, limit, nonzero=False):
+    """Одна страница дампа диапазона s..e: (строки, всего строк)."""
+    if nonzero:
+        rows = list(islice(memory.nonzero(s, e), offset, offset + limit))
+        total = sum(1 for _ in memory.nonzero(s, e))
+    else:
+        start = s + offset
+        rows = list(memory.dump(start, min(e, start + limit - 1)))
+        total = max(0, min(e, len(memory) - 1) - max(s, 0) + 1)
+    return [{'addr': addr, 'value': val} for addr, val in rows], total
+
+
+def iter_csv(memory, s, e):
+    yield "addr,value\n"
+    rows = memory.dump(s, e)
+    while True:
+        chunk = "".join(f"{addr},{val}\n" for addr, val in islice(rows, CSV_ROWS_PER_CHUNK))
+        if not chunk:
+            return
+        yield chunk
+
+
+# Хранилище сессий с TTL, ограничением числа записей и их суммарного размера
+# (для демо, в продакшене используйте Redis и т.д.)
+class SessionStore:
+    def __init__(self, ttl=SESSION_TTL, max_entries=SESSION_MAX_ENTRIES, max_bytes=SESSION_MAX_BYTES):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        # Порядок записей - по времени последнего обращения
+        self.entries = OrderedDict()
+        # Сумма session.size по записям
+        self.bytes_held = 0
+        self.expired = 0
+        self.evicted = 0
+        self.released = 0
+        self.lock = threading.Lock()
+
+    def _purge(self, now):
+        while self.entries:
+            session_id, session = next(iter(self.entries.items()))
+            if now - session.last_access <= self.ttl:
+                break
+            del self.entries[session_id]
+            self.bytes_held -= session.size
+            self.expired += 1
+
+    def get(self, session_id):
+        now = time.monotonic()
+        with self.lock:
+            self._purge(now)
+            session = self.entries.get(session_id)
+            if session is None:
+                session = self.entries[session_id] = SessionState(session_id)
+                while len(self.entries) > self.max_entries:
+                    _, evicted = self.entries.popitem(last=False)
+                    self.bytes_held -= evicted.size
+                    self.evicted += 1
+            else:
+                self.entries.move_to_end(session_id)
+            session.last_access = now
+            return session
+
+    def account(self, session):
+        """Пересчитать размер сессии после ассемблирования или запуска.
+
+        Пока сумма больше max_bytes, у самых давних сессий (кроме этой и занятых
+        другим запросом) сбрасываются ассемблер и снимки памяти.
+        """
+        size = session.nbytes()
+        with self.lock:
+            if self.entries.get(session.session_id) is not session:
+                return
+            self.bytes_held += size - session.size
+            session.size = size
+            for other in list(self.entries.values()):
+                if self.bytes_held <= self.max_bytes:
+                    break
+                if other is session or (other.assembler is None and other.executor is None):
+                    continue
+                if not other.lock.acquire(blocking=False):
+                    continue
+                try:
+                    other.release_caches()
+                    size = other.nbytes()
+                    self.bytes_held += size - other.size
+                    other.size = size
+                    self.released += 1
+                finally:
+                    other.lock.release()
+
+    def stats(self):
+        with self.lock:
+            self._purge(time.monotonic())
+            return {
+                'live_sessions': len(self.entries),
+                'bytes_held': self.bytes_held,
+                'max_bytes': self.max_bytes,
+                'max_entries': self.max_entries,
+                'ttl_seconds': self.ttl,
+                'expired': self.expired,
+                'evicted': self.evicted,
+                'released': self.released
+            }
+
+
+sessions = SessionStore()
 
 
 def get_session(session_id):
-    if session_id not in sessions:
-        sessions[session_id] = SessionState()
-    return sessions[session_id]
+    return sessions.get(session_id)
 
 
 def default_demo_program():
@@ -67,9 +495,8 @@ def api_assemble():
 
     program_text = request.json.get('program', '').strip()
     dump_range = request.json.get('dump_range', '0-127')
-
-    session.program_text = program_text
-    session.dump_range = dump_range
+    mem_size = int(request.json.get('mem_size', ADDR_SPACE))
+    profile = bool(request.json.get('profile', False))
 
     if not ASSEMBLER_AVAILABLE:
         return jsonify({
@@ -84,54 +511,65 @@ def api_assemble():
         })
 
     try:
-        # Ассемблирование
-        bytecode, IR = asm_assemble_text(program_text)
-        session.bytecode = bytecode
-        session.IR = IR
-
-        # Преобразование байткода в красивый hex
+        # Ассемблирование и запуск (или готовый результат из кэша). Текст, параметры и
+        # result_key меняются под одной блокировкой: иначе параллельный запрос той же
+        # сессии подменит программу между запуском и remember_result
+        with session.lock:
+            session.program_text = program_text
+            session.dump_range = dump_range
+            session.mem_size = mem_size
+            key, result, cache_hit = run_program(session, profile, program_text, mem_size)
+            session.remember_result(key)
+        bytecode = result.bytecode_head
+
+        # Преобразование начала байткода в красивый hex
         bytes_per_row = 16
         hex_lines = []
         for i in range(0, len(bytecode), bytes_per_row):
             chunk = bytecode[i:i + bytes_per_row]
             row = ", ".join(f"0x{b:02X}" for b in chunk)
             hex_lines.append(row)
+        if result.bytecode_size > len(bytecode):
+            hex_lines.append(f"... ({result.bytecode_size} bytes total)")
         pretty_hex = "\n".join(hex_lines)
 
-        # Запуск интерпретатора
-        memory = interp_execute(bytecode, mem_size=4096)
-        session.memory = memory
+        memory = result.memory()
 
-        # Парсинг диапазона дампа
-        try:
-            s, e = map(int, dump_range.split("-", 1))
-        except Exception:
-            s, e = 0, 127
-
-        # Подготовка дампа памяти
-        memory_dump = []
-        for addr in range(s, min(e + 1, len(memory))):
-            val = memory[addr] if addr < len(memory) else 0
-            memory_dump.append({
-                'addr': addr,
-                'value': val
-            })
-
-        # Подготовка IR (первые 200 строк)
-        ir_preview = "\n".join(str(x) for x in IR[:200])
+        # Первая страница дампа, остальные запрашиваются через /api/dump
+        s, e = parse_dump_range(dump_range)
+        memory_dump, dump_total = dump_page(memory, s, e, 0, DUMP_PAGE_SIZE)
 
         return jsonify({
             'success': True,
             'bytecode_hex': pretty_hex,
-            'ir_preview': ir_preview,
+            'ir_preview': result.ir_preview,
             'memory_dump': memory_dump,
+            'dump_total': dump_total,
+            'dump_page_size': DUMP_PAGE_SIZE,
             'stats': {
-                'instructions': len(IR),
+                'instructions': result.instructions,
                 'memory_size': len(memory),
-                'bytecode_size': len(bytecode)
+                'memory_bytes_used': memory.bytes_used(),
+                'bytecode_size': result.bytecode_size,
+                'cache_hit': cache_hit,
+                'profile': result.profile if profile else None
             }
         })
 
+    except ServerBusyError as ex:
+        return jsonify({
+            'success': False,
+            'error': str(ex),
+            'busy': True
+        }), 503
+
+    except ExecutionLimitError as ex:
+        return jsonify({
+            'success': False,
+            'error': str(ex),
+            'limit_exceeded': True
+        })
+
     except Exception as ex:
         error_trace = traceback.format_exc()
         return jsonify({
@@ -146,14 +584,27 @@ def api_save_binary():
     session_id = request.json.get('session_id', 'default')
     session = get_session(session_id)
 
-    if session.bytecode is None:
+    if session.result_key is None:
         return jsonify({
             'success': False,
             'error': 'No bytecode available. Assemble a program first.'
         })
 
+    # Байткод целиком кодируется только здесь, из IR программы, давшей result_key;
+    # encode_range не оставляет копию байтов в IR
+    try:
+        with session.lock:
+            program, _, _ = session.assemble(session.result_program_text)
+            bytecode = program.encode_range(0, program.count)
+            sessions.account(session)
+    except (ServerBusyError, ExecutionLimitError, ValueError) as ex:
+        return jsonify({
+            'success': False,
+            'error': str(ex)
+        })
+
     # Создаем файл в памяти
-    mem_file = io.BytesIO(session.bytecode)
+    mem_file = io.BytesIO(bytecode)
     mem_file.seek(0)
 
     return send_file(
@@ -169,35 +620,138 @@ def api_save_dump():
     session_id = request.json.get('session_id', 'default')
     session = get_session(session_id)
 
-    if session.memory is None:
+    if session.result_key is None:
         return jsonify({
             'success': False,
             'error': 'No memory dump available. Assemble and run a program first.'
         })
 
-    # Парсинг диапазона
+    if 'dump_range' in request.json:
+        session.dump_range = request.json['dump_range']
+    dump_format = request.json.get('format', 'csv')
+
     try:
-        s, e = map(int, session.dump_range.split("-", 1))
-    except Exception:
-        s, e = 0, min(127, len(session.memory) - 1)
+        result = session_result(session)
+    except (ServerBusyError, ExecutionLimitError, ValueError) as ex:
+        return jsonify({
+            'success': False,
+            'error': str(ex)
+        })
+    memory = result.memory()
+    s, e = parse_dump_range(session.dump_range)
+
+    # Ответ формируется генератором, без сборки всего файла в памяти
+    if dump_format == 'bin':
+        # Сырые значения int64 little-endian, подряд начиная с адреса s
+        return Response(
+            memory.dump_bytes(s, e),
+            mimetype='application/octet-stream',
+            headers={'Content-Disposition': 'attachment; filename=uvm_memory_dump.bin'}
+        )
+
+    return Response(
+        iter_csv(memory, s, e),
+        mimetype='text/csv',
+        headers={'Content-Disposition': 'attachment; filename=uvm_memory_dump.csv'}
+    )
 
-    # Создаем CSV в памяти
-    output = io.StringIO()
-    output.write("addr,value\n")
-    for addr in range(s, min(e + 1, len(session.memory))):
-        val = session.memory[addr] if addr < len(session.memory) else 0
-        output.write(f"{addr},{val}\n")
 
-    mem_file = io.BytesIO()
-    mem_file.write(output.getvalue().encode('utf-8'))
-    mem_file.seek(0)
+@app.route('/api/dump', methods=['POST'])
+def api_dump():
+    session_id = request.json.get('session_id', 'default')
+    session = get_session(session_id)
 
-    return send_file(
-        mem_file,
-        mimetype='text/csv',
-        as_attachment=True,
-        download_name='uvm_memory_dump.csv'
-    )
+    if session.result_key is None:
+        return jsonify({
+            'success': False,
+            'error': 'No memory dump available. Assemble and run a program first.'
+        })
+
+    offset = max(int(request.json.get('offset', 0)), 0)
+    limit = min(max(int(request.json.get('limit', DUMP_PAGE_SIZE)), 1), DUMP_MAX_LIMIT)
+    nonzero = bool(request.json.get('nonzero', False))
+    s, e = parse_dump_range(request.json.get('dump_range', session.dump_range))
+
+    try:
+        result = session_result(session)
+    except (ServerBusyError, ExecutionLimitError, ValueError) as ex:
+        return jsonify({
+            'success': False,
+            'error': str(ex)
+        })
+
+    rows, total = dump_page(result.memory(), s, e, offset, limit, nonzero)
+    next_offset = offset + len(rows)
+    return jsonify({
+        'success': True,
+        'rows': rows,
+        'offset': offset,
+        'limit': limit,
+        'total': total,
+        'next_offset': next_offset if next_offset < total else None
+    })
+
+
+@app.route('/api/disasm', methods=['POST'])
+def api_disasm():
+    """Постраничная дизассемблированная выдача байткода сессии (для больших программ)."""
+    session_id = request.json.get('session_id', 'default')
+    session = get_session(session_id)
+
+    if disassemble_page is None:
+        return jsonify({
+            'success': False,
+            'error': 'Disassembler module not available'
+        })
+    if not session.program_text:
+        return jsonify({
+            'success': False,
+            'error': 'No program. Assemble a program first.'
+        })
+
+    offset = max(int(request.json.get('offset', 0)), 0)
+    limit = min(max(int(request.json.get('limit', IR_PREVIEW_LINES)), 1), DUMP_MAX_LIMIT)
+
+    try:
+        with session.lock:
+            program, _, total = session.assemble()
+            # Кодируется только эта страница, без копии всего байткода в IR
+            base = program.offset_of(offset)
+            page = program.encode_range(offset, offset + limit)
+            rows = [(base + off, line) for off, line in disassemble_page(page, 0, limit)]
+            sessions.account(session)
+    except Exception as ex:
+        return jsonify({
+            'success': False,
+            'error': str(ex)
+        })
+
+    next_offset = offset + len(rows)
+    return jsonify({
+        'success': True,
+        'rows': rows,
+        'offset': offset,
+        'limit': limit,
+        'total': total,
+        'next_offset': next_offset if next_offset < total else None
+    })
+
+
+@app.route('/api/cache_stats', methods=['GET'])
+def api_cache_stats():
+    return jsonify({
+        'success': True,
+        'cache': result_cache.stats()
+    })
+
+
+@app.route('/api/metrics', methods=['GET'])
+def api_metrics():
+    return jsonify({
+        'success': True,
+        'sessions': sessions.stats(),
+        'cache': result_cache.stats()
+    })
 
 
 @app.route('/api/load_demo', methods=['GET'])
@@ -0,0 +1,30 @@
+# vector_min.asm with directives; assembles to the same bytes as bin/vector_min.bin
+.equ N 8
+.equ X 1
+.equ Y 11
+
+load_const 1 100
+load_const 2 40
+load_const 3 200
+load_const 4 201
+load_const 5 40
+load_const 6 0
+load_const 7 500
+load_const 8 700
+
+load_const 11 90
+load_const 12 200
+load_const 13 20
+load_const 14 220
+load_const 15 10000
+load_const 16 1
+load_const 17 700
+load_const 18 350
+
+.macro vec_min dst a b
+.repeat i N
+min dst+i a+i b+i
+.endr
+.endm
+
+vec_min X X Y
@@ -0,0 +1,152 @@
+"""Throughput benchmarks for the UVM assembler and interpreter.
+
+python benchmarks/bench.py run -n 100000 -o results.json
+python benchmarks/bench.py compare baseline.json results.json --threshold 0.1
+"""
+import argparse
+import gc
+import json
+import os
+import platform
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import uvm_asm
+import uvm_interp
+from gen_asm import DEFAULT_MIX, generate_text, parse_mix
+
+
+def measure(fn, repeat: int = 1, trace_memory: bool = True):
+    """Best wall time over `repeat` runs, plus peak traced allocation of one extra run."""
+    best = None
+    for _ in range(repeat):
+        gc.collect()
+        started = time.perf_counter()
+        fn()
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+    peak = None
+    if trace_memory:
+        gc.collect()
+        tracemalloc.start()
+        fn()
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+    return best, peak
+
+
+def decode_all(bytecode: bytes):
+    pc = 0
+    n = len(bytecode)
+    decode = uvm_interp.decode_command
+    while pc < n:
+        _, size = decode(bytecode, pc)
+        pc += size
+
+
+def run_benchmarks(count: int, seed: int, mix, spread: int, engines, repeat: int, trace_memory: bool):
+    text = generate_text(count, seed, mix, spread)
+    bytecode, _ = uvm_asm.assemble_text(text)
+
+    cases = [
+        ('assemble_text', lambda: uvm_asm.assemble_text(text)),
+        ('decode_command', lambda: decode_all(bytecode)),
+    ]
+    for engine in engines:
+        cases.append((f'execute[{engine}]', lambda engine=engine: uvm_interp.execute(bytecode, engine=engine)))
+
+    results = {}
+    for name, fn in cases:
+        seconds, peak = measure(fn, repeat, trace_memory)
+        results[name] = {
+            'seconds': seconds,
+            'instr_per_sec': count / seconds if seconds else None,
+            'peak_bytes': peak,
+        }
+        peak_text = f"{peak / 1e6:10.2f} MB" if peak is not None else ""
+        print(f"{name:<22} {seconds:10.4f} s {results[name]['instr_per_sec']:14,.0f} instr/s {peak_text}")
+
+    return {
+        'meta': {
+            'instructions': count,
+            'bytecode_bytes': len(bytecode),
+            'seed': seed,
+            'mix': mix or DEFAULT_MIX,
+            'spread': spread,
+            'repeat': repeat,
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+        },
+        'results': results,
+    }
+
+
+def compare(baseline: dict, current: dict, threshold: float):
+    """Return a list of human-readable regressions of current against baseline."""
+    regressions = []
+    for name, base in baseline['results'].items():
+        cur = current['results'].get(name)
+        if cur is None:
+            continue
+        if base.get('instr_per_sec') and cur.get('instr_per_sec'):
+            change = cur['instr_per_sec'] / base['instr_per_sec'] - 1
+            status = 'REGRESSION' if change < -threshold else 'ok'
+            print(f"{name:<22} throughput {change:+8.1%}  {status}")
+            if status != 'ok':
+                regressions.append(f"{name}: throughput {change:+.1%}")
+        if base.get('peak_bytes') and cur.get('peak_bytes'):
+            change = cur['peak_bytes'] / base['peak_bytes'] - 1
+            status = 'REGRESSION' if change > threshold else 'ok'
+            print(f"{name:<22} peak memory {change:+7.1%}  {status}")
+            if status != 'ok':
+                regressions.append(f"{name}: peak memory {change:+.1%}")
+    if baseline['meta'].get('instructions') != current['meta'].get('instructions'):
+        print("warning: baseline and current runs use different program sizes")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    p_run = sub.add_parser('run')
+    p_run.add_argument('-n','--count', type=int, default=100000)
+    p_run.add_argument('-o','--output', default='bench_results.json')
+    p_run.add_argument('--seed', type=int, default=0)
+    p_run.add_argument('--mix', type=parse_mix, default=None)
+    p_run.add_argument('--spread', type=int, default=4096)
+    p_run.add_argument('--engines', default=','.join(uvm_interp.ENGINES))
+    p_run.add_argument('--repeat', type=int, default=3)
+    p_run.add_argument('--no-memory', action='store_true', help='skip the tracemalloc peak-memory pass')
+
+    p_cmp = sub.add_parser('compare')
+    p_cmp.add_argument('baseline')
+    p_cmp.add_argument('current')
+    p_cmp.add_argument('--threshold', type=float, default=0.10)
+
+    args = parser.parse_args()
+
+    if args.command == 'run':
+        engines = [e for e in args.engines.split(',') if e]
+        report = run_benchmarks(args.count, args.seed, args.mix, args.spread, engines,
+                                args.repeat, not args.no_memory)
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+        print("Results written to", args.output)
+    else:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        with open(args.current) as f:
+            current = json.load(f)
+        regressions = compare(baseline, current, args.threshold)
+        if regressions:
+            print(f"{len(regressions)} regression(s) above {args.threshold:.0%}")
+            sys.exit(1)
+        print("No regressions")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+"""Seeded generator of synthetic UVM assembler programs.
+
+python benchmarks/gen_asm.py -n 100000 -o /tmp/prog.asm --seed 1 --mix load_const=4,min=3,read_value=2,write_value=1
+"""
+import argparse
+import random
+import sys
+
+DEFAULT_MIX = {'load_const': 4, 'read_value': 2, 'write_value': 1, 'min': 3}
+# block instructions are only generated when named in --mix
+BLOCK_INSTRUCTIONS = ('vmin', 'vcopy', 'vfill')
+
+# operand field widths: B/C of write_value and B/C of min are 7-bit
+FIELD7 = 1 << 7
+FIELD21 = 1 << 21
+FIELD26 = 1 << 26
+
+
+def parse_mix(text: str):
+    mix = {}
+    for item in text.split(','):
+        name, weight = item.split('=')
+        if name not in DEFAULT_MIX and name not in BLOCK_INSTRUCTIONS:
+            raise ValueError(f"Unknown instruction in mix: {name}")
+        mix[name] = float(weight)
+    return mix
+
+
+def generate_lines(count: int, seed: int = 0, mix=None, spread: int = 4096, max_const: int = 1000,
+                   max_block: int = 64):
+    """Yield `count` random instruction lines; 21-bit addresses are drawn from [0, spread).
+
+    Block instructions get lengths in [0, max_block].
+    """
+    rng = random.Random(seed)
+    mix = mix or DEFAULT_MIX
+    names = list(mix)
+    weights = [mix[n] for n in names]
+    spread = max(1, min(spread, FIELD21))
+    small = min(spread, FIELD7)
+    max_const = max(1, min(max_const, FIELD26))
+    rand = rng.randrange
+    # draw mnemonics in blocks to keep the generator cheap for 10M-instruction programs
+    remaining = count
+    while remaining > 0:
+        block = min(remaining, 65536)
+        for name in rng.choices(names, weights, k=block):
+            if name == 'load_const':
+                yield f"load_const {rand(small)} {rand(max_const)}"
+            elif name == 'read_value':
+                yield f"read_value {rand(small)} {rand(spread)}"
+            elif name == 'write_value':
+                yield f"write_value {rand(small)} {rand(small)} {rand(small)}"
+            elif name == 'vfill':
+                yield f"vfill {rand(spread)} {rand(max_const)} {rand(max_block + 1)}"
+            elif name in BLOCK_INSTRUCTIONS:
+                yield f"{name} {rand(spread)} {rand(spread)} {rand(max_block + 1)}"
+            else:
+                yield f"min {rand(small)} {rand(small)} {rand(spread)}"
+        remaining -= block
+
+
+def generate_text(count: int, seed: int = 0, mix=None, spread: int = 4096, max_const: int = 1000) -> str:
+    return "\n".join(generate_lines(count, seed, mix, spread, max_const)) + "\n"
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('-n','--count', type=int, default=1000)
+    parser.add_argument('-o','--output', default='-')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--mix', type=parse_mix, default=None)
+    parser.add_argument('--spread', type=int, default=4096)
+    parser.add_argument('--max-const', type=int, default=1000)
+    args = parser.parse_args()
+
+    out = sys.stdout if args.output == '-' else open(args.output, 'w')
+    try:
+        for line in generate_lines(args.count, args.seed, args.mix, args.spread, args.max_const):
+            out.write(line + "\n")
+    finally:
+        if out is not sys.stdout:
+            out.close()
+
+
+if __name__ == "__main__":
+    main()
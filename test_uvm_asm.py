@@ -0,0 +1,35 @@
+# test_uvm_asm.py - run with: python -m pytest -q
+import pytest
+
+from uvm_asm import IncrementalAssembler, assemble_text
+
+# operand forms that plain int literals do not cover
+EXPRESSION_LINES = ["min 1,2,3", "load_const 0x10 5", "load_const 2*3 5"]
+
+
+@pytest.mark.parametrize("line", EXPRESSION_LINES)
+def test_incremental_matches_cli(line):
+    expected, _ = assemble_text(line)
+    ia = IncrementalAssembler()
+    ia.update(line)
+    assert ia.bytecode == expected
+
+
+@pytest.mark.parametrize("line", EXPRESSION_LINES)
+def test_incremental_edit_matches_cli(line):
+    # the same line spliced into an existing program, with and without a directive elsewhere
+    for header in ("load_const 1 1", ".equ N 1"):
+        text = f"{header}\n{line}\nmin 4 5 6"
+        ia = IncrementalAssembler()
+        ia.update(f"{header}\nload_const 7 7\nmin 4 5 6")
+        ia.update(text)
+        assert ia.bytecode == assemble_text(text)[0]
+
+
+def test_incremental_bad_line_keeps_state():
+    ia = IncrementalAssembler()
+    ia.update("load_const 1 2\nmin 1 2 3")
+    before = ia.bytecode
+    with pytest.raises(ValueError, match="Line 2"):
+        ia.update("load_const 1 2\nbogus 1 2")
+    assert ia.bytecode == before
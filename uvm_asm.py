@@ -1,12 +1,26 @@
 asm_clean = r''
 
 import argparse
+import ast
+import io
+import os
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
+from array import array
+from itertools import accumulate, chain, islice
 from typing import List, Tuple
 
+from uvm_container import Program
+
 OP_LOAD_CONST = 35
 OP_READ = 32
 OP_WRITE = 17
 OP_MIN = 58
+OP_VMIN = 59
+OP_VCOPY = 33
+OP_VFILL = 36
 
 def mask(n):
     return (1<<n)-1
@@ -31,6 +45,22 @@ def pack_min(B: int, C: int, D: int) -> bytes:
     val = A | ((B & mask(7)) << 6) | ((C & mask(7)) << 13) | ((D & mask(21)) << 20)
     return val.to_bytes(6, 'little')
 
+def _pack_block(op: int, B: int, C: int, D: int) -> bytes:
+    val = op | ((B & mask(21)) << 6) | ((C & mask(21)) << 27) | ((D & mask(16)) << 48)
+    return val.to_bytes(8, 'little')
+
+def pack_vmin(B: int, C: int, D: int) -> bytes:
+    # mem[B+i] = min(mem[B+i], mem[C+i]) for i < D
+    return _pack_block(OP_VMIN, B, C, D)
+
+def pack_vcopy(B: int, C: int, D: int) -> bytes:
+    # mem[B+i] = mem[C+i] for i < D; overlapping ranges copy like memmove
+    return _pack_block(OP_VCOPY, B, C, D)
+
+def pack_vfill(B: int, C: int, D: int) -> bytes:
+    # mem[B+i] = C for i < D
+    return _pack_block(OP_VFILL, B, C, D)
+
 def parse_line(line: str):
     parts = line.strip().split()
     if not parts:
@@ -45,56 +75,679 @@ def parse_line(line: str):
             args.append(int(token.rstrip(',')))
     return (instr, args)
 
+# mnemonic -> (encoder, operand count, encoded size)
+ENCODERS = {
+    'load_const': (pack_load_const, 2, 5),
+    'read_value': (pack_read, 2, 5),
+    'write_value': (pack_write, 3, 4),
+    'min': (pack_min, 3, 6),
+    'vmin': (pack_vmin, 3, 8),
+    'vcopy': (pack_vcopy, 3, 8),
+    'vfill': (pack_vfill, 3, 8),
+}
+
+# mnemonic -> (opcode, B bits, C bits, D bits); fields follow the opcode back to back
+FIELDS = {
+    'load_const': (OP_LOAD_CONST, 7, 26, 0),
+    'read_value': (OP_READ, 7, 21, 0),
+    'write_value': (OP_WRITE, 7, 7, 7),
+    'min': (OP_MIN, 7, 7, 21),
+    'vmin': (OP_VMIN, 21, 21, 16),
+    'vcopy': (OP_VCOPY, 21, 21, 16),
+    'vfill': (OP_VFILL, 21, 21, 16),
+}
+MNEMONICS = {op: name for name, (op, _, _, _) in FIELDS.items()}
+# opcode -> (C shift, D shift)
+SHIFTS = {op: (6 + bbits, 6 + bbits + cbits) for op, bbits, cbits, _ in FIELDS.values()}
+# opcode byte -> encoded size, for bytes.translate over the opcode column
+OP_SIZES = bytes(ENCODERS[MNEMONICS[op]][2] if op in MNEMONICS else 0 for op in range(256))
+
+FLUSH_BYTES = 1 << 20
+CHUNK_LINES = 50000
+# operand values are at most this wide; the widest field has 26 bits
+MAX_OPERAND_BITS = 64
+# repeat iterations and macro calls between deadline and cancel checks
+CHECK_EVERY = 4096
+
+def is_directive(raw: str) -> bool:
+    return raw.lstrip().startswith('.')
+
+def split_operands(text: str):
+    # operands are separated by commas when there are any, by whitespace otherwise;
+    # a "name=" prefix (B=5) is accepted and ignored as in parse_line
+    parts = [p.strip() for p in text.split(',')] if ',' in text else text.split()
+    if parts and not parts[-1]:
+        parts.pop()
+    return [p.split('=', 1)[1].strip() if '=' in p else p for p in parts]
+
+# operand expressions: integers, names and integer arithmetic; / is floor division
+_EXPR_NODES = (ast.Expression, ast.Tuple, ast.BinOp, ast.UnaryOp, ast.Constant, ast.Name, ast.Load,
+               ast.Add, ast.Sub, ast.Mult, ast.Div, ast.FloorDiv, ast.Mod,
+               ast.LShift, ast.RShift, ast.BitAnd, ast.BitOr, ast.BitXor,
+               ast.USub, ast.UAdd, ast.Invert)
+_MISSING = object()
+
+def _checked_lshift(a: int, b: int) -> int:
+    if b > 0 and a.bit_length() + b > MAX_OPERAND_BITS:
+        raise OverflowError(f"{a} << {b} exceeds {MAX_OPERAND_BITS} bits")
+    return a << b
+
+def _checked_mul(a: int, b: int) -> int:
+    if a.bit_length() + b.bit_length() > MAX_OPERAND_BITS + 1:
+        raise OverflowError(f"{a} * {b} exceeds {MAX_OPERAND_BITS} bits")
+    return a * b
+
+# << and * are evaluated through the checked helpers, so an operand cannot grow without bound;
+# their names are not identifiers and cannot be shadowed by .equ or parameters
+_GUARDED_OPS = {ast.LShift: '<<', ast.Mult: '*'}
+_EVAL_GLOBALS = {'__builtins__': {}, '<<': _checked_lshift, '*': _checked_mul}
+_OPERAND_LIMIT = 1 << MAX_OPERAND_BITS
+
+def _small_constant(node, bits: int = MAX_OPERAND_BITS) -> bool:
+    return isinstance(node, ast.Constant) and 0 <= node.value < (1 << bits)
+
+class _GuardOps(ast.NodeTransformer):
+    def visit_BinOp(self, node):
+        self.generic_visit(node)
+        name = _GUARDED_OPS.get(type(node.op))
+        if name is None:
+            return node
+        # a small constant factor or shift adds at most MAX_OPERAND_BITS per source token,
+        # like + does; these common cases are left unchecked
+        if name == '<<' and _small_constant(node.right, MAX_OPERAND_BITS.bit_length()):
+            return node
+        if name == '*' and (_small_constant(node.left) or _small_constant(node.right)):
+            return node
+        return ast.Call(ast.Name(name, ast.Load()), [node.left, node.right], [])
+
+def compile_operands(tokens, lineno: int = 0):
+    """Operand values as a list when all are integer literals, else a code object for the tuple."""
+    try:
+        values = [int(t) for t in tokens]
+    except ValueError:
+        pass
+    else:
+        if any(v.bit_length() > MAX_OPERAND_BITS for v in values):
+            raise ValueError(f"Line {lineno}: operand exceeds {MAX_OPERAND_BITS} bits")
+        return values
+    text = ", ".join(tokens)
+    try:
+        tree = ast.parse(f"({text},)", mode='eval')
+    except SyntaxError:
+        tree = None
+    for node in ast.walk(tree) if tree is not None else ():
+        if not isinstance(node, _EXPR_NODES) or (isinstance(node, ast.Constant)
+                                                 and type(node.value) is not int):
+            tree = None
+            break
+        if isinstance(node, ast.BinOp) and isinstance(node.op, ast.Div):
+            node.op = ast.FloorDiv()
+    if tree is None or len(tree.body.elts) != len(tokens):
+        raise ValueError(f"Line {lineno}: Invalid operand expression: {text}")
+    tree = ast.fix_missing_locations(_GuardOps().visit(tree))
+    return compile(tree, f"<line {lineno}>", 'eval')
+
+class ExpansionLimitError(ValueError):
+    pass
+
+class SourceExpander:
+    """Expands assembler directives lazily into (lineno, instr, args).
+
+    .equ NAME expr            define a constant for the following lines
+    .repeat [VAR] count       repeat the lines up to .endr; VAR counts 0..count-1
+    .macro NAME [params]      define a macro up to .endm, used as NAME args
+
+    Operands may be integer expressions over constants, repeat counters and
+    macro parameters, up to MAX_OPERAND_BITS wide. A block is parsed once when
+    its end directive is read; expansion then only evaluates operands, one
+    instruction at a time, so the expanded text never exists. `top_lineno` is
+    the top-level source line the last yielded instruction came from.
+
+    Every CHECK_EVERY repeat iterations and macro calls, the expansion checks
+    `time_limit` (seconds from the start of expand) and calls `check`, which
+    may raise to abort it.
+    """
+
+    def __init__(self, max_instructions: int = None, time_limit: float = None, check=None):
+        self.symbols = {}
+        self.macros = {}
+        self.max_instructions = max_instructions
+        self.time_limit = time_limit
+        self.check = check
+        self.deadline = None
+        self.count = 0
+        self.steps = 0
+        self.top_lineno = 0
+
+    def expand(self, lines, first_lineno: int = 1):
+        if self.time_limit is not None:
+            self.deadline = time.monotonic() + self.time_limit
+        it = enumerate(lines, first_lineno)
+        macros = self.macros
+        limit = self.max_instructions
+        for lineno, raw in it:
+            s = raw.strip()
+            if not s or s.startswith('#') or s.startswith('//'):
+                continue
+            self.top_lineno = lineno
+            if s[0] != '.':
+                # plain instruction with literal operands: no expression parsing
+                try:
+                    instr, args = parse_line(s)
+                except ValueError:
+                    pass
+                else:
+                    if instr not in macros:
+                        self.count += 1
+                        if limit is not None and self.count > limit:
+                            raise ExpansionLimitError(
+                                f"Line {lineno}: Program has more than {limit} instructions")
+                        yield lineno, instr, args
+                        continue
+            elif s.split(None, 1)[0].lower() == '.macro':
+                self._define_macro(lineno, s, it)
+                continue
+            yield from self._run((self._parse_statement(lineno, s, it),))
+
+    def _parse_statement(self, lineno: int, s: str, it):
+        # node for one source line; block directives consume their body from `it`
+        head, rest = (s.split(None, 1) + [''])[:2]
+        head = head.lower()
+        if head == '.equ':
+            tokens = rest.replace(',', ' ').split(None, 1)
+            if len(tokens) != 2 or not tokens[0].isidentifier():
+                raise ValueError(f"Line {lineno}: expected .equ NAME value")
+            return ('equ', lineno, tokens[0], compile_operands([tokens[1]], lineno))
+        if head == '.repeat':
+            tokens = split_operands(rest)
+            if len(tokens) == 1:
+                var = None
+            elif len(tokens) == 2 and tokens[0].isidentifier():
+                var = tokens.pop(0)
+            else:
+                raise ValueError(f"Line {lineno}: expected .repeat [VAR] count")
+            count = compile_operands(tokens, lineno)
+            return ('repeat', lineno, var, count, self._parse_body(lineno, '.repeat', '.endr', it))
+        if head.startswith('.'):
+            if head == '.macro':
+                raise ValueError(f"Line {lineno}: .macro is only allowed at top level")
+            raise ValueError(f"Line {lineno}: Unexpected directive: {head}")
+        ops = compile_operands(split_operands(rest), lineno)
+        if head in self.macros:
+            return ('call', lineno, head, ops)
+        return ('op', lineno, head, ops)
+
+    def _parse_body(self, lineno: int, opener: str, end: str, it):
+        body = []
+        for n, raw in it:
+            s = raw.strip()
+            if not s or s.startswith('#') or s.startswith('//'):
+                continue
+            if s.split(None, 1)[0].lower() == end:
+                return tuple(body)
+            body.append(self._parse_statement(n, s, it))
+        raise ValueError(f"Line {lineno}: {opener} without {end}")
+
+    def _define_macro(self, lineno: int, s: str, it):
+        tokens = split_operands((s.split(None, 1) + [''])[1])
+        if not tokens or not all(t.isidentifier() for t in tokens):
+            raise ValueError(f"Line {lineno}: expected .macro NAME [params]")
+        name = tokens[0].lower()
+        if name in ENCODERS:
+            raise ValueError(f"Line {lineno}: macro {name} would shadow an instruction")
+        self.macros[name] = (tokens[1:], self._parse_body(lineno, '.macro', '.endm', it))
+
+    def _values(self, ops, lineno: int):
+        if type(ops) is list:
+            return ops[:]
+        try:
+            return list(eval(ops, _EVAL_GLOBALS, self.symbols))
+        except NameError as ex:
+            raise ValueError(f"Line {lineno}: Unknown name {str(ex).split(' ')[1]}") from None
+        except (ArithmeticError, ValueError) as ex:
+            raise ValueError(f"Line {lineno}: {ex}") from None
+        except MemoryError:
+            raise ValueError(f"Line {lineno}: operand too large") from None
+
+    def _bound(self, ops, lineno: int):
+        # values kept in symbols; instruction operands are masked to their field instead
+        values = self._values(ops, lineno)
+        if values and (max(values) >= _OPERAND_LIMIT or min(values) <= -_OPERAND_LIMIT):
+            raise ValueError(f"Line {lineno}: operand exceeds {MAX_OPERAND_BITS} bits")
+        return values
+
+    def _poll(self, lineno: int):
+        if self.deadline is not None and time.monotonic() > self.deadline:
+            raise ExpansionLimitError(f"Line {lineno}: Expansion took longer than {self.time_limit:g}s")
+        if self.check is not None:
+            self.check()
+
+    def _run(self, nodes):
+        env = self.symbols
+        limit = self.max_instructions
+        for node in nodes:
+            kind, lineno = node[0], node[1]
+            if kind == 'op':
+                self.count += 1
+                if limit is not None and self.count > limit:
+                    raise ExpansionLimitError(f"Line {lineno}: Program has more than {limit} instructions")
+                yield lineno, node[2], self._values(node[3], lineno)
+            elif kind == 'equ':
+                env[node[2]], = self._bound(node[3], lineno)
+            elif kind == 'repeat':
+                _, _, var, count, body = node
+                count, = self._bound(count, lineno)
+                if count < 0:
+                    raise ValueError(f"Line {lineno}: negative repeat count {count}")
+                saved = {var: env.get(var, _MISSING)} if var is not None else {}
+                try:
+                    for i in range(count):
+                        # counted per iteration and call: a body without instructions still takes time
+                        self.steps += 1
+                        if not self.steps % CHECK_EVERY:
+                            self._poll(lineno)
+                        if var is not None:
+                            env[var] = i
+                        yield from self._run(body)
+                finally:
+                    _restore(env, saved)
+            else:
+                self.steps += 1
+                if not self.steps % CHECK_EVERY:
+                    self._poll(lineno)
+                params, body = self.macros[node[2]]
+                args = self._bound(node[3], lineno)
+                if len(args) != len(params):
+                    raise ValueError(f"Line {lineno}: {node[2]} expects {len(params)} operands, got {len(args)}")
+                saved = {p: env.get(p, _MISSING) for p in params}
+                env.update(zip(params, args))
+                try:
+                    yield from self._run(body)
+                finally:
+                    _restore(env, saved)
+
+def _restore(env: dict, saved: dict):
+    for name, value in saved.items():
+        if value is _MISSING:
+            env.pop(name, None)
+        else:
+            env[name] = value
+
+def iter_source(lines, first_lineno: int = 1):
+    # (line number, instr, args) for every instruction, with directives expanded
+    return SourceExpander().expand(lines, first_lineno)
+
+def _lookup(instr: str, args, lineno: int):
+    entry = ENCODERS.get(instr)
+    if entry is None:
+        raise ValueError(f"Line {lineno}: Unknown instruction: {instr}")
+    if len(args) != entry[1]:
+        raise ValueError(f"Line {lineno}: {instr} expects {entry[1]} operands, got {len(args)}")
+    return entry
+
+def encode(instr: str, args, lineno: int = 0) -> bytes:
+    return _lookup(instr, args, lineno)[0](*args)
+
+class ProgramIR(Program):
+    """Struct-of-arrays IR: one typed array per field, 13 bytes per instruction.
+
+    Operands are stored masked exactly as the encoder would pack them, so the
+    columns are the same (ops, bs, cs, ds) the interpreter decodes to and can
+    be executed directly. The bytecode is encoded on first access to `code`
+    and then kept in step with splice().
+    """
+
+    def __init__(self):
+        self.ops = array('B')
+        self.bs = array('I')
+        self.cs = array('I')
+        self.ds = array('I')
+        self.offsets = None
+        self.image = None
+        self._code = None
+
+    @property
+    def count(self) -> int:
+        return len(self.ops)
+
+    @property
+    def decoded(self):
+        return self.ops, self.bs, self.cs, self.ds
+
+    @property
+    def code(self) -> bytearray:
+        if self._code is None:
+            self._code = bytearray(self.encode_range(0, len(self.ops)))
+        return self._code
+
+    def __len__(self):
+        # encoded size in bytes, without encoding
+        return sum(self.ops.tobytes().translate(OP_SIZES))
+
+    def __iter__(self):
+        # (instr, args) in the assembler IR shape
+        for op, b, c, d in zip(self.ops, self.bs, self.cs, self.ds):
+            name = MNEMONICS[op]
+            yield (name, [b, c, d] if FIELDS[name][3] else [b, c])
+
+    def __getstate__(self):
+        # the encoded bytes can be rebuilt; do not ship them to worker processes
+        state = self.__dict__.copy()
+        state['_code'] = None
+        return state
+
+    def offset_of(self, n: int) -> int:
+        return sum(self.ops[:n].tobytes().translate(OP_SIZES))
+
+    def append(self, instr: str, args, lineno: int = 0):
+        _lookup(instr, args, lineno)
+        op, bbits, cbits, dbits = FIELDS[instr]
+        self.ops.append(op)
+        self.bs.append(args[0] & mask(bbits))
+        self.cs.append(args[1] & mask(cbits))
+        self.ds.append(args[2] & mask(dbits) if dbits else 0)
+        if self._code is not None:
+            self._code += self.encode_range(len(self.ops) - 1, len(self.ops))
+
+    def splice(self, start: int, stop: int, other: 'ProgramIR'):
+        # replace instructions [start, stop) with those of `other`
+        if self._code is not None:
+            self._code[self.offset_of(start):self.offset_of(stop)] = other.encode_range(0, other.count)
+        self.ops[start:stop] = other.ops
+        self.bs[start:stop] = other.bs
+        self.cs[start:stop] = other.cs
+        self.ds[start:stop] = other.ds
+
+    def encode_range(self, start: int, stop: int) -> bytes:
+        # fields are pre-masked, so packing is only shifts
+        sizes, shifts = OP_SIZES, SHIFTS
+        return b''.join((op | b << 6 | c << shifts[op][0] | d << shifts[op][1]).to_bytes(sizes[op], 'little')
+                        for op, b, c, d in zip(self.ops[start:stop], self.bs[start:stop],
+                                               self.cs[start:stop], self.ds[start:stop]))
+
+    def head(self, nbytes: int) -> bytes:
+        # at least the first nbytes of the bytecode, encoding only what is needed
+        if self._code is not None:
+            return bytes(self._code[:nbytes])
+        return self.encode_range(0, -(-nbytes // 4))[:nbytes]
+
+    def nbytes(self) -> int:
+        return (len(self.ops) * 13 + (len(self._code) if self._code is not None else 0))
+
+def assemble_ir(lines, first_lineno: int = 1) -> ProgramIR:
+    # parse source lines straight into a ProgramIR; nothing is encoded
+    program = ProgramIR()
+    append = program.append
+    for lineno, instr, args in iter_source(lines, first_lineno):
+        append(instr, args, lineno)
+    return program
+
+def expand_program(lines, max_instructions: int = None, time_limit: float = None, check=None):
+    """Expand source lines with directives into (ProgramIR, starts).
+
+    starts[k] is the index of the first instruction of source line k + 1; a
+    block's instructions belong to its opening line. The limits are those of
+    SourceExpander. Picklable, so it can run in a worker process.
+    """
+    program = ProgramIR()
+    per_line = [0] * (len(lines) + 1)
+    expander = SourceExpander(max_instructions, time_limit, check)
+    append = program.append
+    for lineno, instr, args in expander.expand(lines):
+        append(instr, args, lineno)
+        per_line[expander.top_lineno] += 1
+    return program, array('Q', accumulate(per_line))
+
+def assemble_stream(lines, out=None, ir=None, first_lineno: int = 1):
+    """Assemble an iterable of source lines in one pass.
+
+    Encoded instructions go to `out`: a bytearray (created when None) or a
+    binary file object, which is written in FLUSH_BYTES batches. When `ir` is
+    a list, (instr, args) tuples are appended to it. Returns (out, count).
+    """
+    if out is None:
+        out = bytearray()
+    to_file = not isinstance(out, bytearray)
+    buf = bytearray() if to_file else out
+    count = 0
+    for lineno, instr, args in iter_source(lines, first_lineno):
+        buf += encode(instr, args, lineno)
+        if ir is not None:
+            ir.append((instr, args))
+        count += 1
+        if to_file and len(buf) >= FLUSH_BYTES:
+            out.write(buf)
+            buf.clear()
+    if to_file and buf:
+        out.write(buf)
+    return out, count
+
+class IncrementalAssembler:
+    """Assembler for editors that re-parses only the lines changed since the last update.
+
+    The program is kept as a ProgramIR plus, per source line, the index of its
+    first instruction; an update diffs the new text against the previous one
+    by common prefix/suffix and splices that region of the IR. Bytecode is
+    encoded only when `bytecode` is read.
+
+    Directives make lines depend on each other, so while the text contains
+    any, every update expands the whole program again; a block maps to its
+    opening line. max_instructions and time_limit bound an expansion; `expand`
+    (expand_program by default) may be replaced, e.g. to run it in a worker
+    process.
+    """
+
+    def __init__(self, max_instructions: int = None, time_limit: float = None, expand=expand_program):
+        self.lines = []
+        self.starts = array('Q', [0])
+        self.program = ProgramIR()
+        self.max_instructions = max_instructions
+        self.time_limit = time_limit
+        self.expand = expand
+        self.expanded = False
+
+    @property
+    def count(self) -> int:
+        return self.program.count
+
+    def update(self, text: str, check=None):
+        """Re-assemble `text`; returns the changed line range (first, old_end, new_end).
+
+        check is passed to the expansion (see SourceExpander) when directives are present.
+        """
+        new_lines = text.splitlines()
+        old_lines = self.lines
+        n_old, n_new = len(old_lines), len(new_lines)
+        limit = min(n_old, n_new)
+        first = 0
+        while first < limit and old_lines[first] == new_lines[first]:
+            first += 1
+        tail = 0
+        while tail < limit - first and old_lines[n_old - 1 - tail] == new_lines[n_new - 1 - tail]:
+            tail += 1
+        old_end, new_end = n_old - tail, n_new - tail
+
+        if self.expanded or any(map(is_directive, new_lines[first:new_end])):
+            self._reassemble(new_lines, check)
+            return first, old_end, new_end
+
+        # parse the changed lines first so a bad line leaves the state untouched; they go
+        # through SourceExpander like assemble_text, so operand expressions (0x10, 2*3,
+        # commas) are accepted whether or not the program has directives
+        part = ProgramIR()
+        per_line = [0] * (new_end - first)
+        expander = SourceExpander()
+        for lineno, instr, args in expander.expand(new_lines[first:new_end], first + 1):
+            part.append(instr, args, lineno)
+            per_line[lineno - first - 1] += 1
+        counts = accumulate(per_line)
+
+        i0, i1 = self.starts[first], self.starts[old_end]
+        self.program.splice(i0, i1, part)
+        delta = part.count - (i1 - i0)
+        self.lines[first:old_end] = new_lines[first:new_end]
+        self.starts[first + 1:] = array('Q', [i0 + n for n in counts]) + \
+            array('Q', [s + delta for s in self.starts[old_end + 1:]])
+        return first, old_end, new_end
+
+    def _reassemble(self, new_lines, check=None):
+        self.program, self.starts = self.expand(new_lines, self.max_instructions, self.time_limit, check)
+        self.lines = list(new_lines)
+        self.expanded = any(map(is_directive, new_lines))
+
+    @property
+    def bytecode(self) -> bytes:
+        return bytes(self.program.code)
+
+    def ir_preview(self, limit: int = None):
+        return list(islice(self.program, limit))
+
+    def line_offset(self, lineno: int) -> int:
+        # byte offset of the code for 1-based source line `lineno`
+        return self.program.offset_of(self.starts[lineno - 1])
+
+    def nbytes(self) -> int:
+        return (sum(len(s) for s in self.lines) + self.starts.itemsize * len(self.starts)
+                + self.program.nbytes())
+
+def _assemble_chunk(chunk):
+    lines, first_lineno = chunk
+    out, count = assemble_stream(lines, first_lineno=first_lineno)
+    return bytes(out), count
+
+def _iter_chunks(it, chunk_lines: int):
+    lineno = 1
+    while True:
+        chunk = list(islice(it, chunk_lines))
+        if not chunk:
+            return
+        yield chunk, lineno
+        lineno += len(chunk)
+
+def assemble_parallel(lines, out, jobs: int, chunk_lines: int = CHUNK_LINES):
+    """Assemble line chunks across a process pool and write them to `out` in order.
+
+    Every instruction has a fixed size, so chunks are independent; each one
+    carries its first line number so errors still point at the source line.
+    At most 2*jobs chunks are in flight at a time. From the first chunk with
+    a directive on, the source is expanded serially in this process, since
+    later lines may use its definitions. Returns the instruction count.
+    """
+    count = 0
+    it = iter(lines)
+    with ProcessPoolExecutor(max_workers=jobs) as pool:
+        pending = deque()
+        for chunk, lineno in _iter_chunks(it, chunk_lines):
+            if any(map(is_directive, chunk)):
+                while pending:
+                    data, n = pending.popleft().result()
+                    out.write(data)
+                    count += n
+                _, n = assemble_stream(chain(chunk, it), out, first_lineno=lineno)
+                return count + n
+            pending.append(pool.submit(_assemble_chunk, (chunk, lineno)))
+            if len(pending) >= 2 * jobs:
+                data, n = pending.popleft().result()
+                out.write(data)
+                count += n
+        while pending:
+            data, n = pending.popleft().result()
+            out.write(data)
+            count += n
+    return count
+
 def assemble_text(text: str):
-    bytecode = bytes()
     IR = []
-    for raw in text.splitlines():
-        s = raw.strip()
-        if not s or s.startswith('#') or s.startswith('//'):
-            continue
-        parsed = parse_line(s)
-        if parsed is None:
-            continue
-        instr, args = parsed
-        IR.append((instr, args))
-
-        if instr == 'load_const':
-            B,C = args
-            bytecode += pack_load_const(B,C)
-        elif instr == 'read_value':
-            B,C = args
-            bytecode += pack_read(B,C)
-        elif instr == 'write_value':
-            B,C,D = args
-            bytecode += pack_write(B,C,D)
-        elif instr == 'min':
-            B,C,D = args
-            bytecode += pack_min(B,C,D)
+    bytecode, _ = assemble_stream(text.splitlines(), ir=IR)
+    return bytes(bytecode), IR
+
+@contextmanager
+def atomic_path(path: str):
+    # yields a temporary name next to path, renamed over it only on success,
+    # so an error part-way leaves no truncated output behind
+    tmp = f"{path}.{os.getpid()}.tmp"
+    try:
+        yield tmp
+        os.replace(tmp, path)
+    except BaseException:
+        if os.path.exists(tmp):
+            os.unlink(tmp)
+        raise
+
+def write_output(path: str, bytecode, fmt: str = 'raw', decoded: bool = False, image=None):
+    with atomic_path(path) as tmp:
+        if fmt == 'container':
+            # container writer lives with the loader, which already has the boundary scan and decoder
+            from uvm_interp import save_program
+            save_program(tmp, bytecode, decoded=decoded, image=image)
         else:
-            raise ValueError("Unknown instruction: " + instr)
-    return bytecode, IR
+            with open(tmp,'wb') as out:
+                out.write(bytecode)
 
 def main():
     parser = argparse.ArgumentParser()
     parser.add_argument('-i','--input', required=True)
     parser.add_argument('-o','--output', required=True)
     parser.add_argument('-t','--test', default='0')
+    parser.add_argument('-j','--jobs', type=int, default=1)
+    parser.add_argument('-O','--optimize', action='store_true',
+                        help='evaluate the program at assemble time and emit the reduced program')
+    parser.add_argument('--image',
+                        help='with -O, write the precomputed memory image here and emit no instructions')
+    parser.add_argument('-f','--format', choices=('raw', 'container'), default='raw',
+                        help='raw instruction stream or a container with header, offset index and checksum')
+    parser.add_argument('--decoded', action='store_true',
+                        help='with -f container, also store the pre-decoded instruction columns')
     args = parser.parse_args()
+    container = args.format == 'container'
 
-    with open(args.input) as f:
-        text = f.read()
+    if args.optimize:
+        from uvm_opt import fold_ir, materialize, write_image
+        with open(args.input) as f:
+            image = fold_ir((instr, ops) for _, instr, ops in iter_source(f))
+        IR = []
+        if args.image:
+            write_image(args.image, image)
+        elif not container:
+            IR = materialize(image)
+        bytecode = b''.join(encode(instr, ops) for instr, ops in IR)
+        # a container carries the folded image itself, so no instructions are left to run
+        write_output(args.output, bytecode, args.format, args.decoded,
+                     image.items() if container else None)
+        if args.test == '1':
+            print("IR:")
+            for item in IR:
+                print(item)
+            print("bytecode hex:")
+            print(" ".join(f"{b:02X}" for b in bytecode))
+        return
+
+    if args.test != '1' and not container:
+        with open(args.input) as f, atomic_path(args.output) as tmp, open(tmp,'wb') as out:
+            if args.jobs > 1:
+                assemble_parallel(f, out, args.jobs)
+            else:
+                assemble_stream(f, out)
+        return
 
-    bytecode, IR = assemble_text(text)
+    IR = [] if args.test == '1' else None
+    with open(args.input) as f:
+        if args.jobs > 1 and IR is None:
+            out = io.BytesIO()
+            assemble_parallel(f, out, args.jobs)
+            bytecode = out.getbuffer()
+        else:
+            bytecode, _ = assemble_stream(f, ir=IR)
 
-    with open(args.output,'wb') as out:
-        out.write(bytecode)
+    write_output(args.output, bytecode, args.format, args.decoded)
+    if IR is None:
+        return
 
-    if args.test == '1':
-        print("IR:")
-        for item in IR:
-            print(item)
-        print("bytecode hex:")
-        print(" ".join(f"{b:02X}" for b in bytecode))
+    print("IR:")
+    for item in IR:
+        print(item)
+    print("bytecode hex:")
+    print(" ".join(f"{b:02X}" for b in bytecode))
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -0,0 +1,121 @@
+# uvm_client.py - thin client for the uvm_daemon server
+#
+# Imports only the standard library, so a call costs little more than
+# interpreter startup; assembling and execution happen in the daemon.
+#
+#   python uvm_client.py asm -i prog.asm -o prog.bin
+#   python uvm_client.py run -i prog.bin -o dump.csv -r 0-127
+#   python uvm_client.py dump -i prog.bin -r 0-127
+#   python uvm_client.py stats | ping | stop
+import argparse
+import json
+import os
+import socket
+import sys
+import tempfile
+
+# same as uvm_interp.ENGINES; not imported, uvm_interp pulls in NumPy
+ENGINES = ('fast', 'reference', 'vector', 'compiled')
+
+
+def default_socket() -> str:
+    return os.environ.get('UVM_SOCKET') or os.path.join(tempfile.gettempdir(), f"uvm-{os.getuid()}.sock")
+
+
+class DaemonError(RuntimeError):
+    pass
+
+
+class Client:
+    """One connection to the daemon; requests on it are answered in order."""
+
+    def __init__(self, path: str = None):
+        self.path = path or default_socket()
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            self.sock.connect(self.path)
+        except OSError as ex:
+            self.sock.close()
+            raise DaemonError(f"No UVM daemon at {self.path} ({ex.strerror}); "
+                              f"start one with: python uvm_daemon.py -s {self.path}") from None
+        self.reader = self.sock.makefile('rb')
+
+    def request(self, op: str, **params) -> dict:
+        params['op'] = op
+        self.sock.sendall(json.dumps(params).encode('utf-8') + b"\n")
+        line = self.reader.readline()
+        if not line:
+            raise DaemonError("Daemon closed the connection")
+        reply = json.loads(line)
+        if not reply.get('success'):
+            raise DaemonError(reply.get('error', 'request failed'))
+        return reply
+
+    def close(self):
+        self.reader.close()
+        self.sock.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Send jobs to a running uvm_daemon")
+    parser.add_argument('-s','--socket', default=None, help='daemon socket (default: $UVM_SOCKET or a per-user temp path)')
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    p = sub.add_parser('asm', help='assemble like uvm_asm.py')
+    p.add_argument('-i','--input', required=True)
+    p.add_argument('-o','--output', required=True)
+    p.add_argument('-f','--format', choices=('raw', 'container'), default='raw')
+    p.add_argument('--decoded', action='store_true')
+
+    for name, text in (('run', 'execute and write a dump like uvm_interp.py'),
+                       ('dump', 'execute and print the dump as CSV')):
+        p = sub.add_parser(name, help=text)
+        p.add_argument('-i','--input', required=True, help='.bin file (raw or container) or .asm source')
+        p.add_argument('-o','--output', required=(name == 'run'))
+        p.add_argument('-r','--range', required=True)
+        p.add_argument('-e','--engine', choices=ENGINES, default='fast')
+        p.add_argument('--image', help='addr,value CSV preloaded into memory')
+
+    for name in ('stats', 'ping', 'stop'):
+        sub.add_parser(name)
+    args = parser.parse_args()
+
+    # the daemon has its own working directory
+    def absolute(path):
+        return os.path.abspath(path) if path else None
+
+    try:
+        with Client(args.socket) as client:
+            if args.command == 'asm':
+                client.request('assemble', input=absolute(args.input), output=absolute(args.output),
+                               format=args.format, decoded=args.decoded)
+            elif args.command == 'run':
+                client.request('execute', input=absolute(args.input), output=absolute(args.output),
+                               range=args.range, engine=args.engine, image=absolute(args.image))
+                print("Dump written to", args.output)
+            elif args.command == 'dump':
+                reply = client.request('dump', input=absolute(args.input), range=args.range,
+                                       engine=args.engine, image=absolute(args.image))
+                out = open(args.output, 'w') if args.output else sys.stdout
+                try:
+                    out.write("addr,value\n")
+                    out.writelines(f"{a},{v}\n" for a, v in reply['rows'])
+                finally:
+                    if out is not sys.stdout:
+                        out.close()
+            elif args.command == 'stats':
+                print(json.dumps(client.request('stats')['stats'], indent=2))
+            else:
+                client.request(args.command)
+    except DaemonError as ex:
+        print(f"error: {ex}", file=sys.stderr)
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,226 @@
+# uvm_compile.py - compile UVM bytecode into Python functions
+#
+# A UVM program is straight-line code over static addresses, so it can be
+# translated once into Python source: every address gets a slot in a flat
+# list and every instruction becomes one list assignment (a slice assignment
+# for block instructions, whose ranges get consecutive slots). The generated
+# module is compiled with compile(); code objects are cached in memory and
+# on disk (marshal), keyed by the SHA-256 of the bytecode and GENERATOR_VERSION.
+# The disk cache is trimmed to COMPILE_CACHE_MAX_BYTES, least recently used first.
+import hashlib
+import importlib.util
+import marshal
+import os
+import tempfile
+
+from uvm_interp import (ADDR_SPACE, BLOCK_OPS, OP_LOAD_CONST, OP_MIN, OP_READ, OP_VCOPY, OP_VFILL, OP_WRITE,
+                        PagedMemory, Program, program_chunks)
+
+# instructions per generated function; keeps each code object small enough to compile quickly
+COMPILE_CHUNK = 4096
+COMPILE_CACHE_DIR = os.environ.get('UVM_COMPILE_CACHE',
+                                   os.path.join(os.path.expanduser('~'), '.cache', 'uvm'))
+COMPILE_CACHE_MAX_BYTES = 256 * 1024 * 1024
+# part of every cache key: bump whenever generate_source changes the code it produces,
+# so cached code objects from an older generator are not reused
+GENERATOR_VERSION = 1
+# compiled programs kept in memory
+MEMORY_CACHE_ENTRIES = 32
+
+_memory_cache = {}
+
+
+class CompiledProgram:
+    """Generated chunk functions plus the slot <-> address mapping they use.
+
+    `addresses[i]` is the memory address held in slot i of the list passed
+    to every chunk; `written` lists the slots the program stores to.
+    """
+
+    def __init__(self, key: str, code):
+        self.key = key
+        self.code = code
+        namespace = {}
+        exec(code, namespace)
+        self.addresses = namespace['ADDRESSES']
+        self.written = namespace['WRITTEN']
+        self.chunks = namespace['CHUNKS']
+        self.instructions = namespace['INSTRUCTIONS']
+
+    def run(self, memory: PagedMemory):
+        if self.addresses and self.addresses[-1] >= memory.size:
+            raise IndexError(f"Program addresses exceed memory size {memory.size}")
+        m = [memory[a] for a in self.addresses]
+        for chunk in self.chunks:
+            chunk(m)
+        addresses = self.addresses
+        for slot in self.written:
+            memory[addresses[slot]] = m[slot]
+        return memory
+
+
+def generate_source(bytecode, chunk_size: int = COMPILE_CHUNK) -> str:
+    """Python module source for bytecode: one function per chunk_size instructions."""
+    columns = [[], [], [], []]
+    for program in program_chunks(bytecode):
+        for col, part in zip(columns, program):
+            col.extend(part)
+    ops, bs, cs, ds = columns
+
+    # static address of every operand, in execution order; a block adds its whole ranges
+    dsts, srcs = [], []
+    for op, b, c, d in zip(ops, bs, cs, ds):
+        if op in BLOCK_OPS:
+            dsts.extend(range(b, b + d))
+            srcs.append(range(c, c + d) if op != OP_VFILL else ())
+        elif op == OP_LOAD_CONST:
+            dsts.append(b)
+            srcs.append(())
+        elif op == OP_READ:
+            dsts.append(b)
+            srcs.append((c,))
+        elif op == OP_MIN:
+            dsts.append(b)
+            srcs.append((c, d))
+        else:
+            dsts.append(c + d)
+            srcs.append((b,))
+    addresses = sorted(set(dsts).union(*srcs))
+    slot = {a: i for i, a in enumerate(addresses)}
+
+    lines = [f"ADDRESSES = {tuple(addresses)!r}",
+             f"WRITTEN = {tuple(sorted({slot[a] for a in dsts}))!r}",
+             f"INSTRUCTIONS = {len(ops)}",
+             ""]
+    names = []
+    for start in range(0, len(ops), chunk_size):
+        name = f"chunk_{start // chunk_size}"
+        names.append(name)
+        lines.append(f"def {name}(m):")
+        for i in range(start, min(start + chunk_size, len(ops))):
+            op = ops[i]
+            if op in BLOCK_OPS:
+                n = ds[i]
+                if not n:
+                    continue
+                dst = slot[bs[i]]
+                if op == OP_VFILL:
+                    lines.append(f"    m[{dst}:{dst + n}] = [{cs[i]}] * {n}")
+                    continue
+                src = slot[cs[i]]
+                if op == OP_VCOPY:
+                    lines.append(f"    m[{dst}:{dst + n}] = m[{src}:{src + n}]")
+                else:
+                    lines.append(f"    m[{dst}:{dst + n}] = list(map(min, m[{dst}:{dst + n}], m[{src}:{src + n}]))")
+                continue
+            dst, src = slot[bs[i] if op != OP_WRITE else cs[i] + ds[i]], srcs[i]
+            if op == OP_LOAD_CONST:
+                lines.append(f"    m[{dst}] = {cs[i]}")
+            elif op == OP_MIN:
+                x, y = slot[src[0]], slot[src[1]]
+                lines.append(f"    m[{dst}] = m[{x}] if m[{x}] < m[{y}] else m[{y}]")
+            else:
+                lines.append(f"    m[{dst}] = m[{slot[src[0]]}]")
+        if lines[-1].startswith("def "):
+            lines.append("    pass")  # a chunk of empty blocks only
+        lines.append("")
+    lines.append(f"CHUNKS = ({''.join(n + ', ' for n in names)})")
+    return "\n".join(lines) + "\n"
+
+
+def program_hash(bytecode) -> str:
+    code = bytecode.code if isinstance(bytecode, Program) else bytecode
+    h = hashlib.sha256(b"uvm-compile %d\0" % GENERATOR_VERSION)
+    h.update(code)
+    return h.hexdigest()
+
+
+def _cache_path(cache_dir: str, key: str) -> str:
+    return os.path.join(cache_dir, key + '.uvmc')
+
+
+def _load_cached(cache_dir: str, key: str):
+    path = _cache_path(cache_dir, key)
+    try:
+        with open(path, 'rb') as f:
+            data = f.read()
+        # the mtime is the last use, for _trim_cache
+        os.utime(path)
+    except OSError:
+        return None
+    # code objects are only valid for the interpreter version that produced them
+    magic = importlib.util.MAGIC_NUMBER
+    if not data.startswith(magic):
+        return None
+    try:
+        return marshal.loads(data[len(magic):])
+    except (EOFError, ValueError, TypeError):
+        return None
+
+
+def _store_cached(cache_dir: str, key: str, code):
+    try:
+        os.makedirs(cache_dir, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=cache_dir, suffix='.tmp')
+        with os.fdopen(fd, 'wb') as f:
+            f.write(importlib.util.MAGIC_NUMBER + marshal.dumps(code))
+        os.replace(tmp, _cache_path(cache_dir, key))
+        _trim_cache(cache_dir, COMPILE_CACHE_MAX_BYTES)
+    except OSError:
+        # the disk cache is an optimization; a read-only home must not break execution
+        pass
+
+
+def _trim_cache(cache_dir: str, max_bytes: int):
+    # delete the least recently used entries until the cache fits in max_bytes
+    entries = []
+    for entry in os.scandir(cache_dir):
+        if entry.name.endswith('.uvmc'):
+            try:
+                st = entry.stat()
+            except OSError:
+                continue  # removed by another process
+            entries.append((st.st_mtime, st.st_size, entry.path))
+    total = sum(size for _, size, _ in entries)
+    for _, size, path in sorted(entries):
+        if total <= max_bytes:
+            break
+        try:
+            os.unlink(path)
+        except OSError:
+            pass
+        total -= size
+
+
+def compile_program(bytecode, cache_dir: str = COMPILE_CACHE_DIR) -> CompiledProgram:
+    """CompiledProgram for bytecode, from the memory cache, the disk cache or a fresh compile.
+
+    cache_dir=None disables the disk cache.
+    """
+    key = program_hash(bytecode)
+    compiled = _memory_cache.pop(key, None)
+    if compiled is not None:
+        _memory_cache[key] = compiled  # most recently used goes last
+        return compiled
+
+    code = _load_cached(cache_dir, key) if cache_dir else None
+    if code is None:
+        code = compile(generate_source(bytecode), f"<uvm {key[:12]}>", 'exec')
+        if cache_dir:
+            _store_cached(cache_dir, key, code)
+    compiled = CompiledProgram(key, code)
+
+    if len(_memory_cache) >= MEMORY_CACHE_ENTRIES:
+        _memory_cache.pop(next(iter(_memory_cache)))
+    _memory_cache[key] = compiled
+    return compiled
+
+
+def execute_compiled(bytecode, mem_size: int = ADDR_SPACE, initial=None,
+                     cache_dir: str = COMPILE_CACHE_DIR):
+    memory = PagedMemory(mem_size)
+    if isinstance(bytecode, Program) and bytecode.image is not None:
+        memory.load(bytecode.image)
+    if initial is not None:
+        memory.load(initial)
+    return compile_program(bytecode, cache_dir).run(memory)
@@ -0,0 +1,153 @@
+# uvm_container.py - versioned .bin container for UVM programs
+#
+# Layout (all integers little-endian):
+#   header   '<4sHHQQQ'  magic b'UVMC', version, flags, instruction count,
+#                        code length in bytes, image entry count
+#   code     raw instructions, same bytes as a legacy .bin
+#   index    count x uint64 byte offsets of each instruction    (FLAG_INDEX);
+#            the loader decodes at these instead of scanning for boundaries
+#   decoded  count x uint32 per column: opcode, B, C, D         (FLAG_DECODED)
+#   image    entries x int64 addresses, then entries x int64 values (FLAG_IMAGE)
+#   crc32    uint32 over everything above
+#
+# Files without the magic are legacy raw instruction streams.
+import struct
+import sys
+import zlib
+from array import array
+
+MAGIC = b'UVMC'
+VERSION = 1
+
+FLAG_INDEX = 1
+FLAG_DECODED = 2
+FLAG_IMAGE = 4
+
+_HEADER = struct.Struct('<4sHHQQQ')
+_CRC = struct.Struct('<I')
+
+
+class ContainerError(ValueError):
+    pass
+
+
+class Program:
+    """A loaded program: code buffer plus whichever optional sections were present.
+
+    Legacy raw files load as a Program with only `code` set.
+    """
+
+    def __init__(self, code, count: int = None, offsets=None, decoded=None, image=None):
+        self.code = code
+        self.count = count
+        self.offsets = offsets
+        self.decoded = decoded
+        self.image = image
+
+    def __len__(self):
+        return len(self.code)
+
+    def offset_of(self, n: int) -> int:
+        # byte offset of instruction n; O(1) with an index section
+        if self.offsets is None:
+            raise ContainerError("Program has no offset index")
+        if n == self.count:
+            return len(self.code)
+        return self.offsets[n]
+
+
+def is_container(buf) -> bool:
+    return len(buf) >= _HEADER.size and buf[:4] == MAGIC
+
+
+def _le(arr):
+    if sys.byteorder != 'little':
+        arr = array(arr.typecode, arr)
+        arr.byteswap()
+    return arr.tobytes()
+
+
+def _load(typecode: str, buf, pos: int, n: int):
+    # a typed view into buf, so an mmap'd section is paged in only as it is read;
+    # big-endian hosts get a byteswapped copy
+    end = pos + n * array(typecode).itemsize
+    view = memoryview(buf)[pos:end]
+    if sys.byteorder == 'little':
+        return view.cast('B').cast(typecode), end
+    arr = array(typecode)
+    arr.frombytes(view)
+    arr.byteswap()
+    return arr, end
+
+
+def write_container(out, code, count: int, offsets=None, decoded=None, image=None):
+    """Write a container to the binary file object `out`.
+
+    offsets: instruction byte offsets; decoded: (ops, bs, cs, ds) columns;
+    image: (addr, value) pairs preloaded before execution.
+    """
+    flags = 0
+    sections = []
+    if offsets is not None:
+        flags |= FLAG_INDEX
+        sections.append(_le(array('Q', offsets)))
+    if decoded is not None:
+        flags |= FLAG_DECODED
+        sections.extend(_le(array('I', col)) for col in decoded)
+    entries = 0
+    if image is not None:
+        flags |= FLAG_IMAGE
+        pairs = sorted(image)
+        entries = len(pairs)
+        sections.append(_le(array('q', [a for a, _ in pairs])))
+        sections.append(_le(array('q', [v for _, v in pairs])))
+
+    header = _HEADER.pack(MAGIC, VERSION, flags, count, len(code), entries)
+    crc = 0
+    for chunk in (header, code, *sections):
+        out.write(chunk)
+        crc = zlib.crc32(chunk, crc)
+    out.write(_CRC.pack(crc))
+
+
+def read_container(buf, verify: bool = True) -> Program:
+    """Parse a container held in buf (bytes or mmap); code is a zero-copy view."""
+    if not is_container(buf):
+        raise ContainerError("Not a UVM container")
+    _, version, flags, count, code_len, entries = _HEADER.unpack_from(buf, 0)
+    if version != VERSION:
+        raise ContainerError(f"Unsupported container version {version}")
+
+    size = _HEADER.size + code_len
+    if flags & FLAG_INDEX:
+        size += count * 8
+    if flags & FLAG_DECODED:
+        size += count * 16
+    if flags & FLAG_IMAGE:
+        size += entries * 16
+    if len(buf) != size + _CRC.size:
+        raise ContainerError(f"Container size mismatch: expected {size + _CRC.size} bytes, got {len(buf)}")
+
+    view = memoryview(buf)
+    if verify:
+        crc, = _CRC.unpack_from(buf, size)
+        if zlib.crc32(view[:size]) != crc:
+            raise ContainerError("Container checksum mismatch")
+
+    pos = _HEADER.size
+    code = view[pos:pos + code_len]
+    pos += code_len
+    offsets = decoded = image = None
+    if flags & FLAG_INDEX:
+        offsets, pos = _load('Q', buf, pos, count)
+    if flags & FLAG_DECODED:
+        cols = []
+        for _ in range(4):
+            col, pos = _load('I', buf, pos, count)
+            cols.append(col)
+        decoded = tuple(cols)
+    if flags & FLAG_IMAGE:
+        addrs, pos = _load('q', buf, pos, entries)
+        values, pos = _load('q', buf, pos, entries)
+        image = list(zip(addrs, values))
+    return Program(code, count, offsets, decoded, image)
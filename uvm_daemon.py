@@ -0,0 +1,280 @@
+# uvm_daemon.py - long-lived assembler/interpreter server on a Unix socket
+#
+# Pipelines that run uvm_asm.py / uvm_interp.py once per program pay for
+# interpreter startup, imports and argparse on every call. The daemon stays
+# up instead: clients (uvm_client.py) send newline-delimited JSON requests
+# over a Unix socket, asyncio serves all connections at once and the CPU work
+# runs in a process pool.
+#
+# Warm state:
+#   programs  .asm/.bin files, assembled or decoded once, keyed by path,
+#             mtime and size (a changed file is reloaded)
+#   results   final memory images, keyed by program hash (code and container
+#             image), memory size and preloaded image, so repeated runs and
+#             dumps skip execution
+#   compiled  the workers keep uvm_compile's in-memory cache; its disk cache
+#             is shared between workers and restarts
+#
+# Requests: {"op": ..., params}; replies: {"success": true, ...} or
+# {"success": false, "error": ...}.
+#   assemble  input, output, format (raw|container), decoded
+#   execute   input, output, range, engine, image   (writes the dump CSV)
+#   dump      input, range, engine, image           (returns rows)
+#   stats, ping, stop
+import argparse
+import asyncio
+import hashlib
+import json
+import os
+import signal
+import time
+from array import array
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+
+from uvm_asm import assemble_ir, write_output
+from uvm_client import default_socket
+from uvm_container import Program, is_container, read_container
+from uvm_interp import ADDR_SPACE, ENGINES, PagedMemory, execute, parse_range, predecode, read_golden, write_dump
+
+PROGRAM_CACHE_BYTES = 256 * 1024 * 1024
+RESULT_CACHE_BYTES = 256 * 1024 * 1024
+# rows a single dump reply may carry; larger ranges go through execute with an output file
+DUMP_MAX_ROWS = 1 << 20
+# longest request line accepted from a client
+REQUEST_LIMIT = 1 << 20
+
+
+class LRUCache:
+    """LRU mapping bounded by the total size of its entries."""
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self.entries = OrderedDict()
+        self.bytes_held = 0
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        entry = self.entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        self.entries.move_to_end(key)
+        self.hits += 1
+        return entry[0]
+
+    def put(self, key, value, size: int):
+        if size > self.max_bytes:
+            return
+        old = self.entries.pop(key, None)
+        if old is not None:
+            self.bytes_held -= old[1]
+        self.entries[key] = (value, size)
+        self.bytes_held += size
+        while self.bytes_held > self.max_bytes:
+            _, (_, evicted) = self.entries.popitem(last=False)
+            self.bytes_held -= evicted
+
+    def stats(self) -> dict:
+        return {'entries': len(self.entries), 'bytes_held': self.bytes_held,
+                'max_bytes': self.max_bytes, 'hits': self.hits, 'misses': self.misses}
+
+
+def load_job(path: str):
+    """Runs in a worker: (Program with decoded columns, SHA-256 of its code and image) for a .asm or .bin file."""
+    if path.endswith('.asm'):
+        with open(path) as f:
+            ir = assemble_ir(f)
+        program = Program(bytes(ir.code), ir.count, decoded=ir.decoded)
+    else:
+        with open(path, 'rb') as f:
+            data = f.read()
+        program = read_container(data) if is_container(data) else Program(data)
+        # a container's sections are views into data; plain bytes and arrays pickle back to the daemon
+        program.code = bytes(program.code)
+        if program.decoded is None:
+            program.decoded = predecode(program.code, program.offsets)
+            program.count = len(program.decoded[0])
+        else:
+            program.decoded = tuple(array('I', col) for col in program.decoded)
+        program.offsets = None
+    digest = hashlib.sha256(program.code)
+    if program.image:
+        # a container's image is part of the program: same code, different image, different result
+        digest.update(repr(list(program.image)).encode('ascii'))
+    return program, digest.hexdigest()
+
+
+def execute_job(program: Program, engine: str, mem_size: int, image_path: str):
+    """Runs in a worker: final memory as a page image (see PagedMemory.to_image)."""
+    initial = zip(*read_golden(image_path)) if image_path else None
+    return execute(program, mem_size, engine, initial=initial).to_image()
+
+
+class Daemon:
+    def __init__(self, socket_path: str, jobs: int = None):
+        self.socket_path = socket_path
+        self.pool = ProcessPoolExecutor(max_workers=jobs)
+        self.programs = LRUCache(PROGRAM_CACHE_BYTES)
+        self.results = LRUCache(RESULT_CACHE_BYTES)
+        # key -> task of a load or run in progress, so concurrent clients share it
+        self.inflight = {}
+        self.requests = 0
+        self.started = time.time()
+        self.stopping = asyncio.Event()
+
+    async def _run_job(self, fn, *args):
+        return await asyncio.get_running_loop().run_in_executor(self.pool, fn, *args)
+
+    async def _cached(self, cache: LRUCache, key, make, size_of):
+        # (value, hit): from the cache, from a task already computing it, or computed now
+        value = cache.get(key)
+        if value is not None:
+            return value, True
+        task = self.inflight.get(key)
+        if task is None:
+            async def compute():
+                try:
+                    result = await make()
+                    cache.put(key, result, size_of(result))
+                    return result
+                finally:
+                    del self.inflight[key]
+            task = self.inflight[key] = asyncio.ensure_future(compute())
+        return await asyncio.shield(task), False
+
+    async def program(self, path: str):
+        st = os.stat(path)
+        key = ('program', path, st.st_mtime_ns, st.st_size)
+        (program, digest), hit = await self._cached(
+            self.programs, key, lambda: self._run_job(load_job, path),
+            lambda r: len(r[0].code) + 16 * r[0].count)
+        return program, digest, hit
+
+    async def result(self, req: dict):
+        # (PagedMemory, Program, hit) for an execute or dump request
+        program, digest, _ = await self.program(req['input'])
+        engine = req.get('engine') or 'fast'
+        if engine not in ENGINES:
+            raise ValueError(f"Unknown engine {engine}")
+        mem_size = int(req.get('mem_size') or ADDR_SPACE)
+        image_path = req.get('image')
+        image_key = None
+        if image_path:
+            st = os.stat(image_path)
+            image_key = (image_path, st.st_mtime_ns, st.st_size)
+        # every engine produces the same memory, so the engine is not part of the key
+        key = ('result', digest, mem_size, image_key)
+        image, hit = await self._cached(
+            self.results, key, lambda: self._run_job(execute_job, program, engine, mem_size, image_path),
+            lambda img: sum(len(raw) for raw in img.values()))
+        return PagedMemory.from_image(image, mem_size), program, hit
+
+    async def handle_assemble(self, req: dict) -> dict:
+        program, _, hit = await self.program(req['input'])
+        await self._run_job(write_output, req['output'], program.code, req.get('format') or 'raw',
+                            bool(req.get('decoded')))
+        return {'instructions': program.count, 'bytes': len(program.code), 'cached': hit}
+
+    async def handle_execute(self, req: dict) -> dict:
+        started = time.perf_counter()
+        memory, program, hit = await self.result(req)
+        if req.get('output'):
+            start, end = parse_range(req['range'])
+            await asyncio.to_thread(write_dump, req['output'], memory, start, end)
+        return {'instructions': program.count, 'seconds': time.perf_counter() - started, 'cached': hit}
+
+    async def handle_dump(self, req: dict) -> dict:
+        start, end = parse_range(req['range'])
+        if end - start + 1 > DUMP_MAX_ROWS:
+            raise ValueError(f"Range has more than {DUMP_MAX_ROWS} rows; use execute with an output file")
+        memory, _, hit = await self.result(req)
+        return {'rows': list(memory.dump(start, end)), 'cached': hit}
+
+    async def handle_stats(self, req: dict) -> dict:
+        return {'stats': {'programs': self.programs.stats(), 'results': self.results.stats(),
+                          'requests': self.requests, 'inflight': len(self.inflight),
+                          'uptime_seconds': time.time() - self.started}}
+
+    async def handle_ping(self, req: dict) -> dict:
+        return {}
+
+    async def handle_stop(self, req: dict) -> dict:
+        self.stopping.set()
+        return {}
+
+    async def dispatch(self, req: dict) -> dict:
+        handler = getattr(self, f"handle_{req.get('op')}", None)
+        if handler is None:
+            raise ValueError(f"Unknown op {req.get('op')!r}")
+        reply = await handler(req)
+        reply['success'] = True
+        return reply
+
+    async def serve_client(self, reader, writer):
+        try:
+            while True:
+                try:
+                    line = await reader.readline()
+                except ValueError:
+                    # the request exceeded REQUEST_LIMIT; the stream cannot be resynchronized
+                    writer.write(b'{"success": false, "error": "Request too long"}\n')
+                    break
+                if not line:
+                    break
+                self.requests += 1
+                try:
+                    reply = await self.dispatch(json.loads(line))
+                except Exception as ex:
+                    reply = {'success': False, 'error': f"{type(ex).__name__}: {ex}"}
+                writer.write(json.dumps(reply).encode('utf-8') + b"\n")
+                await writer.drain()
+        except (ConnectionError, asyncio.CancelledError):
+            # the client went away, or the daemon is stopping
+            pass
+        finally:
+            writer.close()
+
+    async def serve(self):
+        _claim_socket(self.socket_path)
+        server = await asyncio.start_unix_server(self.serve_client, self.socket_path, limit=REQUEST_LIMIT)
+        os.chmod(self.socket_path, 0o600)
+        loop = asyncio.get_running_loop()
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            loop.add_signal_handler(sig, self.stopping.set)
+        print(f"UVM daemon listening on {self.socket_path}", flush=True)
+        try:
+            async with server:
+                await self.stopping.wait()
+        finally:
+            if os.path.exists(self.socket_path):
+                os.unlink(self.socket_path)
+            self.pool.shutdown(cancel_futures=True)
+
+
+def _claim_socket(path: str):
+    # a socket file left by a crashed daemon is removed; a live daemon is not replaced
+    if not os.path.exists(path):
+        return
+    import socket
+    probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        probe.connect(path)
+    except OSError:
+        os.unlink(path)
+    else:
+        raise RuntimeError(f"A UVM daemon is already listening on {path}")
+    finally:
+        probe.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve assemble/execute/dump jobs on a Unix socket")
+    parser.add_argument('-s','--socket', default=None, help='socket path (default: $UVM_SOCKET or a per-user temp path)')
+    parser.add_argument('-j','--jobs', type=int, default=None, help='worker processes (default: CPU count)')
+    args = parser.parse_args()
+    asyncio.run(Daemon(args.socket or default_socket(), args.jobs).serve())
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,193 @@
+# uvm_disasm.py - bulk decoder and disassembler for UVM bytecode
+#
+# Decoding runs in two passes over the whole buffer: a boundary scan that
+# only looks at opcode bytes, then field extraction for all instructions at
+# once from 8-byte little-endian windows (NumPy when available).
+import argparse
+import struct
+import sys
+from bisect import bisect_right
+from itertools import repeat
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+OP_LOAD_CONST = 35
+OP_READ = 32
+OP_WRITE = 17
+OP_MIN = 58
+OP_VMIN = 59
+OP_VCOPY = 33
+OP_VFILL = 36
+
+def mask(n):
+    return (1<<n)-1
+
+# opcode -> (mnemonic, size, B bits, C bits, D bits); fields follow the 6-bit
+# opcode back to back, so B starts at bit 6, C at 6 + B bits, D after C.
+# The block ops (vmin/vcopy/vfill) are 8 bytes: B and C 21-bit addresses
+# (vfill: C is the fill constant), D a 16-bit length.
+LAYOUTS = {
+    OP_LOAD_CONST: ('load_const', 5, 7, 26, 0),
+    OP_READ: ('read_value', 5, 7, 21, 0),
+    OP_WRITE: ('write_value', 4, 7, 7, 7),
+    OP_MIN: ('min', 6, 7, 7, 21),
+    OP_VMIN: ('vmin', 8, 21, 21, 16),
+    OP_VCOPY: ('vcopy', 8, 21, 21, 16),
+    OP_VFILL: ('vfill', 8, 21, 21, 16),
+}
+BLOCK_OPS = (OP_VMIN, OP_VCOPY, OP_VFILL)
+MAX_SIZE = 8
+
+# byte -> instruction size for translate(); 0 marks an unknown opcode
+SIZE_TABLE = bytes(LAYOUTS[b & 63][1] if b & 63 in LAYOUTS else 0 for b in range(256))
+# per-opcode field masks and shifts, indexed by opcode
+_BMASKS, _CMASKS, _DMASKS = [0]*64, [0]*64, [0]*64
+_CSHIFTS, _DSHIFTS = [0]*64, [0]*64
+for _op, (_, _, _bbits, _cbits, _dbits) in LAYOUTS.items():
+    _BMASKS[_op] = mask(_bbits)
+    _CMASKS[_op] = mask(_cbits)
+    _DMASKS[_op] = mask(_dbits)
+    _CSHIFTS[_op] = 6 + _bbits
+    _DSHIFTS[_op] = 6 + _bbits + _cbits
+_WORD = struct.Struct('<Q')
+
+# structured-array layout returned by decode()
+DECODED_DTYPE = [('offset', '<u8'), ('op', 'u1'), ('B', '<u4'), ('C', '<u4'), ('D', '<u4')]
+
+
+def scan(buf, start: int = 0, limit: int = -1):
+    """Offsets of up to `limit` instructions from byte `start`; returns (offsets, end)."""
+    n = len(buf)
+    # one size byte per buffer byte, computed in C; the loop only follows the chain.
+    # No instruction is longer than MAX_SIZE bytes, so a limited scan needs a bounded window.
+    window = n if limit < 0 else min(n, start + MAX_SIZE * limit)
+    sizes = bytes(buf[start:window]).translate(SIZE_TABLE)
+    offsets = []
+    append = offsets.append
+    pc = start
+    while pc < n:
+        size = sizes[pc - start]
+        if not size:
+            raise ValueError(f"Unknown opcode {buf[pc] & 63}")
+        if pc + size > n:
+            raise EOFError("Incomplete command")
+        append(pc)
+        pc += size
+        limit -= 1
+        if not limit:
+            break
+    return offsets, pc
+
+
+def decode_columns(buf, offsets):
+    """(ops, bs, cs, ds) for instructions at the given byte offsets.
+
+    NumPy arrays when NumPy is available, lists otherwise.
+    """
+    n = len(buf)
+    if np is not None:
+        if not offsets:
+            return tuple(np.zeros(0, dtype=np.uint32) for _ in range(4))
+        # only the bytes spanned by these instructions are copied; zero padding
+        # lets every instruction read a full window
+        lo = offsets[0]
+        data = np.frombuffer(bytes(buf[lo:offsets[-1] + 8]) + bytes(8), dtype=np.uint8)
+        off = np.asarray(offsets, dtype=np.int64) - lo
+        words = data[off].astype(np.uint64)
+        for k in range(1, MAX_SIZE):
+            words |= data[off + k].astype(np.uint64) << np.uint64(8 * k)
+        ops = (words & np.uint64(63)).astype(np.uint32)
+
+        def table(values):
+            return np.asarray(values, dtype=np.uint64)[ops]
+
+        bs = ((words >> np.uint64(6)) & table(_BMASKS)).astype(np.uint32)
+        cs = ((words >> table(_CSHIFTS)) & table(_CMASKS)).astype(np.uint32)
+        ds = ((words >> table(_DSHIFTS)) & table(_DMASKS)).astype(np.uint32)
+        return ops, bs, cs, ds
+
+    # pure-Python fallback; instructions closer than 8 bytes to the end are read from a short slice
+    split = bisect_right(offsets, n - 8)
+    words = [w for w, in map(_WORD.unpack_from, repeat(buf), offsets[:split])]
+    words.extend(int.from_bytes(buf[o:min(o + 8, n)], 'little') for o in offsets[split:])
+    bmasks, cmasks, dmasks, cshifts, dshifts = _BMASKS, _CMASKS, _DMASKS, _CSHIFTS, _DSHIFTS
+    return ([w & 63 for w in words], [(w>>6)&bmasks[w & 63] for w in words],
+            [(w>>cshifts[w & 63])&cmasks[w & 63] for w in words],
+            [(w>>dshifts[w & 63])&dmasks[w & 63] for w in words])
+
+
+def decode(buf, start: int = 0, limit: int = -1):
+    """Structured array (DECODED_DTYPE) for up to `limit` instructions from byte `start`."""
+    if np is None:
+        raise RuntimeError("NumPy is required for structured output (pip install numpy)")
+    offsets, _ = scan(buf, start, limit)
+    table = np.zeros(len(offsets), dtype=DECODED_DTYPE)
+    table['offset'] = offsets
+    table['op'], table['B'], table['C'], table['D'] = decode_columns(buf, offsets)
+    return table
+
+
+def iter_ir(buf, limit: int = -1):
+    # (mnemonic, [args]) in the same shape as the assembler IR
+    offsets, _ = scan(buf, 0, limit)
+    for op, b, c, d in zip(*(col.tolist() if np is not None else col
+                            for col in decode_columns(buf, offsets))):
+        name, _, _, _, dbits = LAYOUTS[op]
+        yield name, ([b, c, d] if dbits else [b, c])
+
+
+def disassemble(buf, limit: int = -1):
+    # assembly lines; assemble_text() of them reproduces buf exactly
+    for name, args in iter_ir(buf, limit):
+        yield name + " " + " ".join(map(str, args))
+
+
+def disassemble_page(buf, first: int, count: int):
+    # [(byte offset, assembly line)] for instructions first..first+count-1; only that page is decoded
+    offsets, _ = scan(buf, 0, first + count)
+    offsets = offsets[first:]
+    rows = []
+    for off, op, b, c, d in zip(offsets, *(col.tolist() if np is not None else col
+                                           for col in decode_columns(buf, offsets))):
+        name, _, _, _, dbits = LAYOUTS[op]
+        rows.append((off, f"{name} {b} {c} {d}" if dbits else f"{name} {b} {c}"))
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Disassemble UVM bytecode")
+    parser.add_argument('-i','--input', required=True, help='.bin file (raw or container)')
+    parser.add_argument('-o','--output', help='output file (default: stdout for asm/csv)')
+    parser.add_argument('-f','--format', choices=('asm', 'csv', 'npy'), default='asm',
+                        help='assembly text, offset,op,B,C,D CSV, or a NumPy structured array')
+    parser.add_argument('-n','--limit', type=int, default=-1, help='decode at most N instructions')
+    args = parser.parse_args()
+
+    from uvm_interp import open_bytecode
+    code = open_bytecode(args.input)
+
+    if args.format == 'npy':
+        if not args.output:
+            parser.error("-o/--output is required for npy")
+        np.save(args.output, decode(code, 0, args.limit))
+        return
+
+    out = open(args.output, 'w') if args.output else sys.stdout
+    try:
+        if args.format == 'asm':
+            for line in disassemble(code, args.limit):
+                out.write(line + "\n")
+        else:
+            offsets, _ = scan(code, 0, args.limit)
+            out.write("offset,op,B,C,D\n")
+            for row in zip(offsets, *(list(col) for col in decode_columns(code, offsets))):
+                out.write(",".join(map(str, row)) + "\n")
+    finally:
+        if out is not sys.stdout:
+            out.close()
+
+if __name__ == "__main__":
+    main()
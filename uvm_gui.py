@@ -3,19 +3,36 @@ from tkinter import ttk, filedialog, messagebox
 import traceback
 import sys
 import os
+import queue
+import threading
 import uvm_asm
 import inspect
 
 
 try:
     from uvm_asm import assemble_text as asm_assemble_text
+    from uvm_asm import IncrementalAssembler
 except Exception:
     asm_assemble_text = None
+    IncrementalAssembler = None
 
 try:
     from uvm_interp import execute as interp_execute
+    from uvm_interp import CheckpointExecutor
 except Exception:
     interp_execute = None
+    CheckpointExecutor = None
+
+# how often the Tk loop picks up messages from the worker thread
+POLL_MS = 50
+# bytecode beyond this is not rendered as hex (the full binary can still be saved)
+HEX_PREVIEW_BYTES = 4096
+# .repeat/.macro expansion stops here (13 bytes of IR per instruction)
+MAX_INSTRUCTIONS = 20000000
+
+
+class RunCancelled(Exception):
+    pass
 
 
 class UVMGuiApp(tk.Tk):
@@ -23,11 +40,28 @@ class UVMGuiApp(tk.Tk):
         super().__init__()
         self.title("UVM — Assembler & Interpreter (GUI)")
         self.geometry("1000x700")
+
+        # virtual memory view: the dump range is dump_start..dump_start+dump_count-1,
+        # and only tree_rows rows starting at view_top exist in the Treeview
+        self.dump_start = 0
+        self.dump_count = 0
+        self.view_top = 0
+        self.tree_rows = 30
+
+        # background run: the worker posts messages to `results`, polled with after()
+        self.worker = None
+        self.results = queue.Queue()
+        self.cancel_event = threading.Event()
+        self.instruction_count = 0
+
         self.create_widgets()
 
-        # last assembled results
-        self.bytecode = None
+        # last assembled results (the bytecode itself is encoded from the assembler on save)
         self.IR = None
+        # keeps the program as a compact IR so re-assembly only re-parses edited lines
+        self.assembler = IncrementalAssembler(MAX_INSTRUCTIONS) if IncrementalAssembler is not None else None
+        # memory snapshots so re-runs after an edit resume from the nearest one before it
+        self.executor = CheckpointExecutor() if CheckpointExecutor is not None else None
         self.memory = None
         self.binary_path = None
 
@@ -67,6 +101,12 @@ class UVMGuiApp(tk.Tk):
         self.btn_assemble = ttk.Button(controls, text="Assemble & Run", command=self.on_assemble_run)
         self.btn_assemble.pack(fill=tk.X, padx=4, pady=4)
 
+        self.btn_cancel = ttk.Button(controls, text="Cancel", command=self.on_cancel, state=tk.DISABLED)
+        self.btn_cancel.pack(fill=tk.X, padx=4, pady=2)
+
+        self.progress = ttk.Progressbar(controls, mode="determinate", maximum=1000)
+        self.progress.pack(fill=tk.X, padx=4, pady=2)
+
         self.btn_save_bin = ttk.Button(controls, text="Save last binary...", command=self.on_save_binary)
         self.btn_save_bin.pack(fill=tk.X, padx=4, pady=2)
 
@@ -86,17 +126,22 @@ class UVMGuiApp(tk.Tk):
         mem_frame.pack(fill=tk.BOTH, expand=True, padx=4, pady=6)
 
         columns = ("addr", "value")
-        self.tree = ttk.Treeview(mem_frame, columns=columns, show="headings", selectmode="none", height=30)
+        self.tree = ttk.Treeview(mem_frame, columns=columns, show="headings", selectmode="none",
+                                 height=self.tree_rows)
         self.tree.heading("addr", text="addr")
         self.tree.heading("value", text="value")
         self.tree.column("addr", width=80, anchor="center")
         self.tree.column("value", width=120, anchor="e")
         self.tree.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+        self.set_tree_rows(self.tree_rows)
 
-        # scrollbar for tree
-        tree_scroll = ttk.Scrollbar(mem_frame, orient="vertical", command=self.tree.yview)
-        tree_scroll.pack(side=tk.RIGHT, fill=tk.Y)
-        self.tree.configure(yscrollcommand=tree_scroll.set)
+        # the scrollbar drives the virtual window, not the Treeview itself
+        self.tree_scroll = ttk.Scrollbar(mem_frame, orient="vertical", command=self.on_tree_scroll)
+        self.tree_scroll.pack(side=tk.RIGHT, fill=tk.Y)
+        self.tree.bind("<MouseWheel>", self.on_tree_wheel)
+        self.tree.bind("<Button-4>", self.on_tree_wheel)
+        self.tree.bind("<Button-5>", self.on_tree_wheel)
+        self.tree.bind("<Configure>", self.on_tree_resize)
 
         # bottom: bytecode hex and IR
         bottom = ttk.Frame(self)
@@ -165,76 +210,200 @@ class UVMGuiApp(tk.Tk):
         self.status.config(text=f"Saved {os.path.basename(path)}")
 
     def on_assemble_run(self):
-        # Disable button while running
+        if self.assembler is None:
+            messagebox.showerror("Error", "Assembler function `assemble_text` not found. Make sure uvm24_asm.py is in the same folder.")
+            return
+        if self.executor is None:
+            messagebox.showerror("Error", "Interpreter function `execute` not found. Make sure uvm24_interp.py is in the same folder.")
+            return
+        if self.worker is not None:
+            return
+
+        prog_text = self.text_prog.get("1.0", tk.END)
         self.btn_assemble.config(state=tk.DISABLED)
+        self.btn_cancel.config(state=tk.NORMAL)
+        self.progress["value"] = 0
+        self.status.config(text="Assembling...")
+
+        # assembly and execution run off the Tk thread; results come back via _poll_worker
+        self.cancel_event.clear()
+        self.worker = threading.Thread(target=self._run_job, args=(prog_text,), daemon=True)
+        self.worker.start()
+        self.after(POLL_MS, self._poll_worker)
+
+    def on_cancel(self):
+        self.cancel_event.set()
+        self.btn_cancel.config(state=tk.DISABLED)
+        self.status.config(text="Cancelling...")
+
+    def _run_job(self, prog_text):
+        # worker thread: no Tk calls here, only messages to self.results
+        def check_cancel():
+            if self.cancel_event.is_set():
+                raise RunCancelled()
+
         try:
-            prog_text = self.text_prog.get("1.0", tk.END)
-            if asm_assemble_text is None:
-                raise ImportError("Assembler function `assemble_text` not found. Make sure uvm24_asm.py is in the same folder.")
-            if interp_execute is None:
-                raise ImportError("Interpreter function `execute` not found. Make sure uvm24_interp.py is in the same folder.")
-
-            # assemble
-            bytecode, IR = asm_assemble_text(prog_text)
-            self.bytecode = bytecode
-            self.IR = IR
-
-            # show bytecode hex
-            # === Красивый вывод байткода в формате 0xNN, как в PDF ===
-            self.txt_bytecode.delete("1.0", tk.END)
-
-            # Построчно по 16 байт
-            bytes_per_row = 16
-            lines = []
-            for i in range(0, len(bytecode), bytes_per_row):
-                chunk = bytecode[i:i + bytes_per_row]
-                row = ", ".join(f"0x{b:02X}" for b in chunk)
-                lines.append(row)
-
-            pretty_hex = "\n".join(lines)
-            self.txt_bytecode.insert("1.0", pretty_hex)
-
-            # show IR (first 50 lines)
-            self.txt_ir.delete("1.0", tk.END)
-            ir_text = "\n".join(str(x) for x in IR[:200])
-            self.txt_ir.insert("1.0", ir_text)
-
-            # run interpreter
-            memory = interp_execute(bytecode, mem_size=4096)
-            self.memory = memory
-
-            # parse dump range
-            rng = self.ent_range.get().strip()
-            try:
-                s,e = (int(x) for x in rng.split("-", 1))
-            except Exception:
-                s,e = 0, 127
-
-            # populate treeview
-            for item in self.tree.get_children():
-                self.tree.delete(item)
-            for addr in range(s, e+1):
-                val = memory[addr] if addr < len(memory) else 0
-                self.tree.insert("", "end", values=(addr, val))
-
-            self.status.config(text=f"Assembled {len(IR)} instructions; memory size {len(memory)}")
-            self.binary_path = None  # assembled but not saved
+            # a long .repeat expansion polls check_cancel, so Cancel works while assembling too
+            self.assembler.update(prog_text, check=check_cancel)
+            # the IR is executed as is; bytes are encoded only for the hex preview and on save
+            program = self.assembler.program
+            self.results.put(("assembled", program.head(HEX_PREVIEW_BYTES), len(program),
+                              self.assembler.ir_preview(200), self.assembler.count))
+
+            def progress(index, offset, total):
+                check_cancel()
+                self.results.put(("progress", offset / total if total else 1.0, index))
+
+            check_cancel()
+            memory = self.executor.run(program, progress=progress)
+            self.results.put(("done", memory, self.executor.resumed_from))
+        except RunCancelled:
+            self.results.put(("cancelled",))
         except Exception as ex:
-            tb = traceback.format_exc()
-            messagebox.showerror("Error", f"Exception:\n{ex}\n\nTraceback:\n{tb}")
-            self.status.config(text="Error")
-        finally:
+            self.results.put(("error", ex, traceback.format_exc()))
+
+    def _poll_worker(self):
+        finished = False
+        try:
+            while not finished:
+                msg = self.results.get_nowait()
+                kind = msg[0]
+                if kind == "assembled":
+                    _, head, size, IR, count = msg
+                    self.IR = IR
+                    self.instruction_count = count
+                    self.show_bytecode(head, size, IR)
+                    self.status.config(text=f"Assembled {count} instructions; running...")
+                elif kind == "progress":
+                    _, fraction, index = msg
+                    self.progress["value"] = fraction * 1000
+                    self.status.config(text=f"Running: {index} of {self.instruction_count} instructions")
+                elif kind == "done":
+                    _, memory, resumed_from = msg
+                    self.memory = memory
+                    self.progress["value"] = 1000
+                    self.show_dump()
+                    self.status.config(text=f"Assembled {self.instruction_count} instructions; memory size {len(memory)}; "
+                                            f"{len(memory.pages)} pages touched; resumed at #{resumed_from}")
+                    self.binary_path = None  # assembled but not saved
+                    finished = True
+                elif kind == "cancelled":
+                    self.progress["value"] = 0
+                    self.status.config(text="Cancelled")
+                    finished = True
+                else:
+                    _, ex, tb = msg
+                    messagebox.showerror("Error", f"Exception:\n{ex}\n\nTraceback:\n{tb}")
+                    self.status.config(text="Error")
+                    finished = True
+        except queue.Empty:
+            pass
+
+        if finished:
+            self.worker = None
             self.btn_assemble.config(state=tk.NORMAL)
+            self.btn_cancel.config(state=tk.DISABLED)
+        else:
+            self.after(POLL_MS, self._poll_worker)
+
+    def show_bytecode(self, head, size, IR):
+        # === Красивый вывод байткода в формате 0xNN, как в PDF ===
+        self.txt_bytecode.delete("1.0", tk.END)
+
+        # Построчно по 16 байт
+        bytes_per_row = 16
+        lines = []
+        for i in range(0, min(size, HEX_PREVIEW_BYTES), bytes_per_row):
+            chunk = head[i:min(i + bytes_per_row, HEX_PREVIEW_BYTES)]
+            row = ", ".join(f"0x{b:02X}" for b in chunk)
+            lines.append(row)
+        if size > HEX_PREVIEW_BYTES:
+            lines.append(f"... ({size} bytes total)")
+
+        pretty_hex = "\n".join(lines)
+        self.txt_bytecode.insert("1.0", pretty_hex)
+
+        # show IR (first lines)
+        self.txt_ir.delete("1.0", tk.END)
+        ir_text = "\n".join(str(x) for x in IR)
+        self.txt_ir.insert("1.0", ir_text)
+
+    def show_dump(self):
+        # parse dump range
+        rng = self.ent_range.get().strip()
+        try:
+            s,e = (int(x) for x in rng.split("-", 1))
+        except Exception:
+            s,e = 0, 127
+        s = max(s, 0)
+        e = min(e, len(self.memory) - 1)
+        self.dump_start = s
+        self.dump_count = max(e - s + 1, 0)
+        self.view_top = 0
+        self.render_rows()
+
+    def set_tree_rows(self, n):
+        items = self.tree.get_children()
+        for _ in range(len(items), n):
+            self.tree.insert("", "end", values=("", ""))
+        if len(items) > n:
+            self.tree.delete(*items[n:])
+        self.tree_rows = n
+
+    def render_rows(self):
+        # fill the fixed set of Treeview rows from the memory backend
+        rows = self.tree_rows
+        self.view_top = max(0, min(self.view_top, self.dump_count - rows))
+        values = []
+        if self.memory is not None and self.dump_count:
+            first = self.dump_start + self.view_top
+            last = self.dump_start + min(self.view_top + rows, self.dump_count) - 1
+            values = list(self.memory.dump(first, last))
+        for i, item in enumerate(self.tree.get_children()):
+            self.tree.item(item, values=values[i] if i < len(values) else ("", ""))
+        if self.dump_count:
+            self.tree_scroll.set(self.view_top / self.dump_count,
+                                 min(1.0, (self.view_top + rows) / self.dump_count))
+        else:
+            self.tree_scroll.set(0.0, 1.0)
+
+    def on_tree_scroll(self, action, *args):
+        if action == "moveto":
+            self.view_top = int(float(args[0]) * self.dump_count)
+        elif action == "scroll":
+            step = self.tree_rows if args[1] == "pages" else 1
+            self.view_top += int(args[0]) * step
+        self.render_rows()
+
+    def on_tree_wheel(self, event):
+        if event.num == 4 or getattr(event, "delta", 0) > 0:
+            self.view_top -= 3
+        else:
+            self.view_top += 3
+        self.render_rows()
+        return "break"
+
+    def on_tree_resize(self, event):
+        rowheight = int(ttk.Style().lookup("Treeview", "rowheight") or 20)
+        # one row height is taken by the heading
+        rows = max(1, event.height // rowheight - 1)
+        if rows != self.tree_rows:
+            self.set_tree_rows(rows)
+            self.render_rows()
 
     def on_save_binary(self):
-        if self.bytecode is None:
+        if self.IR is None:
             messagebox.showinfo("No binary", "Nothing assembled yet. Press 'Assemble & Run' first.")
             return
+        if self.worker is not None:
+            # the worker may be splicing the assembler's IR right now
+            messagebox.showinfo("Busy", "Wait for the current run to finish.")
+            return
         path = filedialog.asksaveasfilename(defaultextension=".bin", filetypes=[("Binary","*.bin"),("All files","*.*")])
         if not path:
             return
         with open(path, "wb") as f:
-            f.write(self.bytecode)
+            f.write(self.assembler.bytecode)
         self.binary_path = path
         self.status.config(text=f"Saved binary: {os.path.basename(path)}")
 
@@ -254,8 +423,7 @@ class UVMGuiApp(tk.Tk):
 
         with open(path, "w", encoding="utf-8") as f:
             f.write("addr,value\n")
-            for addr in range(s, e+1):
-                val = self.memory[addr] if addr < len(self.memory) else 0
+            for addr, val in self.memory.dump(s, e):
                 f.write(f"{addr},{val}\n")
         self.status.config(text=f"Saved dump: {os.path.basename(path)}")
 
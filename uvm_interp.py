@@ -1,11 +1,26 @@
 interp_clean = r''
 
 import argparse
+import glob
+import mmap
+import os
+import sys
+import time
+from array import array
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+from uvm_disasm import BLOCK_OPS, decode_columns, scan
+from uvm_container import Program, is_container, read_container, write_container
+from uvm_memory import ADDR_SPACE, PAGE_BITS, PAGE_MASK, PagedMemory
 
 OP_LOAD_CONST = 35
 OP_READ = 32
 OP_WRITE = 17
 OP_MIN = 58
+OP_VMIN = 59
+OP_VCOPY = 33
+OP_VFILL = 36
 
 def mask(n):
     return (1<<n)-1
@@ -60,11 +75,503 @@ def decode_command(data: bytes, offset: int):
             'D': (full>>20)&mask(21)
         }, 6
 
+    elif opcode in BLOCK_OPS:
+        if rem < 8: raise EOFError
+        full = int.from_bytes(data[offset:offset+8],'little')
+        return {
+            'op':{OP_VMIN:'vmin', OP_VCOPY:'vcopy', OP_VFILL:'vfill'}[opcode],
+            'A': full & mask(6),
+            'B': (full>>6)&mask(21),
+            'C': (full>>27)&mask(21),
+            'D': (full>>48)&mask(16)
+        }, 8
+
     else:
         raise ValueError(f"Unknown opcode {opcode}")
 
-def execute(bytecode: bytes, mem_size: int = 4096):
-    memory = [0]*mem_size
+ENGINES = ('fast', 'reference', 'vector', 'compiled')
+
+SLICE_SIZE = 65536
+CHECKPOINT_INTERVAL = SLICE_SIZE
+CHECKPOINT_BUDGET = 64 * 1024 * 1024
+
+OP_NAMES = {
+    OP_LOAD_CONST: 'load_const',
+    OP_READ: 'read_value',
+    OP_WRITE: 'write_value',
+    OP_MIN: 'min',
+    OP_VMIN: 'vmin',
+    OP_VCOPY: 'vcopy',
+    OP_VFILL: 'vfill',
+}
+
+class Profiler:
+    """Per-opcode counts and time, per-address read/write heat and an optional trace.
+
+    Passed to execute()/execute_limited(); when no profiler is given the
+    unprofiled loop runs unchanged.
+    """
+
+    def __init__(self, trace_size: int = 0):
+        self.counts = dict.fromkeys(OP_NAMES, 0)
+        self.times_ns = dict.fromkeys(OP_NAMES, 0)
+        self.reads = {}
+        self.writes = {}
+        self.trace = deque(maxlen=trace_size) if trace_size else None
+
+    def report(self, top: int = 10) -> dict:
+        def hottest(heat):
+            return sorted(heat.items(), key=lambda kv: (-kv[1], kv[0]))[:top]
+        return {
+            'opcodes': {OP_NAMES[op]: {'count': self.counts[op], 'seconds': self.times_ns[op] / 1e9}
+                        for op in OP_NAMES},
+            'instructions': sum(self.counts.values()),
+            'addresses_read': len(self.reads),
+            'addresses_written': len(self.writes),
+            'hot_reads': hottest(self.reads),
+            'hot_writes': hottest(self.writes),
+            'trace': [(i, OP_NAMES[op], b, c, d) for i, op, b, c, d in self.trace] if self.trace is not None else None,
+        }
+
+    def format_report(self, top: int = 10) -> str:
+        rep = self.report(top)
+        lines = ["opcode          count      time, ms"]
+        for name, st in rep['opcodes'].items():
+            lines.append(f"{name:<12} {st['count']:>10} {st['seconds']*1000:>12.3f}")
+        lines.append(f"addresses read: {rep['addresses_read']}, written: {rep['addresses_written']}")
+        lines.append("hot reads:  " + ", ".join(f"{a}x{n}" for a, n in rep['hot_reads']))
+        lines.append("hot writes: " + ", ".join(f"{a}x{n}" for a, n in rep['hot_writes']))
+        if rep['trace'] is not None:
+            lines.append(f"last {len(rep['trace'])} instructions:")
+            lines.extend(f"  #{i} {name} {b} {c} {d}" for i, name, b, c, d in rep['trace'])
+        return "\n".join(lines)
+
+class ExecutionLimitError(RuntimeError):
+    pass
+
+class _DeadlineExceeded(Exception):
+    # raised inside a slice; the caller turns it into an ExecutionLimitError with its counts
+    pass
+
+_BLOCK_OPS = frozenset(BLOCK_OPS)
+
+def weight(program) -> int:
+    # instruction budget of decoded columns: a block op costs one per element, like the loop it replaces
+    ops, ds = program[0], program[3]
+    n = len(ops)
+    if _BLOCK_OPS.isdisjoint(ops):
+        return n
+    return n + sum(d - 1 for op, d in zip(ops, ds) if d > 1 and op in BLOCK_OPS)
+
+def _decode_range(buf, pc: int, limit: int):
+    # decode up to `limit` instructions of buf starting at byte pc: boundary scan, then bulk field extraction
+    offsets, pc = scan(buf, pc, limit)
+    return _decode_at(buf, offsets), pc
+
+def _decode_at(buf, offsets):
+    # decoded columns as arrays for instructions at known byte offsets
+    columns = decode_columns(buf, offsets)
+    program = []
+    for col in columns:
+        arr = array('I')
+        if isinstance(col, list):
+            arr.fromlist(col)
+        else:
+            arr.frombytes(col.astype('=u4').tobytes())
+        program.append(arr)
+    return tuple(program)
+
+def predecode(data: bytes, offsets=None):
+    # offsets: a container's index section, which saves the boundary scan
+    if offsets is not None:
+        return _decode_at(data, offsets)
+    program, _ = _decode_range(data, 0, -1)
+    return program
+
+def predecode_chunks(data, chunk_size: int = SLICE_SIZE):
+    # yields programs of at most chunk_size instructions, so only one chunk is decoded at a time
+    n = len(data)
+    pc = 0
+    while pc < n:
+        program, pc = _decode_range(data, pc, chunk_size)
+        yield program
+
+def instruction_offsets(data) -> array:
+    # byte offset of every instruction, by a boundary scan over the opcode bytes
+    return array('Q', scan(data)[0])
+
+def open_program(path: str, verify: bool = True) -> Program:
+    # memory-maps the file; containers are parsed, legacy raw files become Program(code)
+    with open(path,'rb') as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            return Program(b'', 0)
+        data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    if is_container(data):
+        return read_container(data, verify)
+    return Program(data)
+
+def open_bytecode(path: str):
+    # raw instruction bytes of a .bin file in either format, without copying
+    return open_program(path).code
+
+def save_program(path: str, bytecode, index: bool = True, decoded: bool = False, image=None):
+    offsets = instruction_offsets(bytecode)
+    columns = predecode(bytecode) if decoded else None
+    with open(path, 'wb') as out:
+        write_container(out, bytecode, len(offsets), offsets if index else None, columns, image)
+
+def program_chunks(data, slice_size: int = SLICE_SIZE):
+    # like predecode_chunks, but slices the pre-decoded section of a container instead of decoding,
+    # or decodes at the offsets of its index section instead of scanning for boundaries
+    if not isinstance(data, Program):
+        return predecode_chunks(data, slice_size)
+    if data.decoded is None and data.offsets is not None:
+        return (_decode_at(data.code, data.offsets[i:i + slice_size])
+                for i in range(0, data.count, slice_size))
+    if data.decoded is None:
+        return predecode_chunks(data.code, slice_size)
+    return (tuple(col[i:i + slice_size] for col in data.decoded)
+            for i in range(0, data.count, slice_size))
+
+def max_address(program) -> int:
+    ops, bs, cs, ds = program
+    hi = -1
+    for op, b, c, d in zip(ops, bs, cs, ds):
+        if op == OP_WRITE:
+            c += d
+        elif op == OP_READ:
+            d = 0
+        elif op == OP_LOAD_CONST:
+            c = d = 0
+        elif op in BLOCK_OPS:
+            # last address of each range; vfill's C is a constant, an empty block touches nothing
+            if not d:
+                continue
+            b, c, d = b + d - 1, (c + d - 1 if op != OP_VFILL else 0), 0
+        if b > hi:
+            hi = b
+        if c > hi or d > hi:
+            hi = c if c > d else d
+    return hi
+
+def run_predecoded(program, memory: PagedMemory, start: int = 0, stop: int = None, deadline: float = None):
+    if start or stop is not None:
+        program = tuple(col[start:stop] for col in program)
+    if memory.size < ADDR_SPACE and max_address(program) >= memory.size:
+        raise IndexError(f"Program addresses exceed memory size {memory.size}")
+    # page lookups are inlined: untouched pages read as 0, writes allocate
+    get = memory.pages.get
+    page = memory.page
+    for op, b, c, d in zip(*program):
+        if op == OP_LOAD_CONST:
+            (get(b >> PAGE_BITS) or page(b >> PAGE_BITS))[b & PAGE_MASK] = c
+        elif op == OP_MIN:
+            pg = get(c >> PAGE_BITS)
+            val1 = pg[c & PAGE_MASK] if pg else 0
+            pg = get(d >> PAGE_BITS)
+            val2 = pg[d & PAGE_MASK] if pg else 0
+            (get(b >> PAGE_BITS) or page(b >> PAGE_BITS))[b & PAGE_MASK] = val1 if val1 < val2 else val2
+        elif op == OP_READ:
+            pg = get(c >> PAGE_BITS)
+            val = pg[c & PAGE_MASK] if pg else 0
+            (get(b >> PAGE_BITS) or page(b >> PAGE_BITS))[b & PAGE_MASK] = val
+        elif op == OP_WRITE:
+            addr = c + d
+            pg = get(b >> PAGE_BITS)
+            val = pg[b & PAGE_MASK] if pg else 0
+            (get(addr >> PAGE_BITS) or page(addr >> PAGE_BITS))[addr & PAGE_MASK] = val
+        elif op in BLOCK_OPS:
+            # one block op may take as long as a whole slice of scalar ones
+            if deadline is not None and time.monotonic() > deadline:
+                raise _DeadlineExceeded
+            run_block(memory, op, b, c, d)
+        else:
+            # columns from a container's index or decoded section skip the scan's opcode check
+            raise ValueError(f"Unknown opcode {op}")
+    return memory
+
+def run_block(memory: PagedMemory, op: int, b: int, c: int, d: int):
+    # block ops read their whole source before writing, so overlapping ranges behave like memmove
+    if op == OP_VFILL:
+        memory.fill(b, d, c)
+    elif op == OP_VCOPY:
+        memory.write_block(b, memory.read_block(c, d))
+    elif op == OP_VMIN:
+        memory.write_block(b, array('q', map(min, memory.read_block(b, d), memory.read_block(c, d))))
+    else:
+        raise ValueError(f"Unknown opcode {op}")
+
+def run_profiled(program, memory: PagedMemory, profiler: Profiler, first_index: int = 0, deadline: float = None):
+    now = time.perf_counter_ns
+    counts, times = profiler.counts, profiler.times_ns
+    reads, writes = profiler.reads, profiler.writes
+    trace = profiler.trace
+    for i, (op, b, c, d) in enumerate(zip(*program), first_index):
+        t0 = now()
+        if op == OP_LOAD_CONST:
+            memory[b] = c
+            dst = b
+        elif op == OP_MIN:
+            val1 = memory[c]
+            val2 = memory[d]
+            memory[b] = val1 if val1 < val2 else val2
+            reads[c] = reads.get(c, 0) + 1
+            reads[d] = reads.get(d, 0) + 1
+            dst = b
+        elif op == OP_READ:
+            memory[b] = memory[c]
+            reads[c] = reads.get(c, 0) + 1
+            dst = b
+        elif op == OP_WRITE:
+            dst = c + d
+            memory[dst] = memory[b]
+            reads[b] = reads.get(b, 0) + 1
+        elif op in BLOCK_OPS:
+            if deadline is not None and time.monotonic() > deadline:
+                raise _DeadlineExceeded
+            run_block(memory, op, b, c, d)
+            if op != OP_VFILL:
+                for a in range(c, c + d):
+                    reads[a] = reads.get(a, 0) + 1
+            if op == OP_VMIN:
+                for a in range(b, b + d):
+                    reads[a] = reads.get(a, 0) + 1
+            for a in range(b, b + d):
+                writes[a] = writes.get(a, 0) + 1
+            dst = None
+        else:
+            raise ValueError(f"Unknown opcode {op}")
+        if dst is not None:
+            writes[dst] = writes.get(dst, 0) + 1
+        counts[op] += 1
+        times[op] += now() - t0
+        if trace is not None:
+            trace.append((i, op, b, c, d))
+    return memory
+
+def execute(bytecode: bytes, mem_size: int = ADDR_SPACE, engine: str = 'fast', profiler: Profiler = None,
+            initial=None):
+    # bytecode may be any buffer, e.g. an mmap from open_bytecode, or a Program from open_program;
+    # it is decoded chunk by chunk. initial: optional (addr, value) pairs preloaded before the
+    # first instruction, after the Program's own image
+    if engine == 'reference' and profiler is None:
+        return execute_reference(bytecode, mem_size, initial)
+    if engine == 'vector' and profiler is None:
+        # NumPy engine; imported lazily since numpy is optional
+        from uvm_vector import execute_vectorized
+        return execute_vectorized(bytecode, mem_size, initial)
+    if engine == 'compiled' and profiler is None:
+        # translated to Python once per distinct bytecode, then cached
+        from uvm_compile import execute_compiled
+        return execute_compiled(bytecode, mem_size, initial)
+    if engine not in ENGINES:
+        raise ValueError(f"Unknown engine {engine}")
+    return execute_limited(bytecode, mem_size, profiler=profiler, initial=initial)
+
+def execute_limited(bytecode: bytes, mem_size: int = ADDR_SPACE, max_instructions: int = None,
+                    time_limit: float = None, slice_size: int = SLICE_SIZE, profiler: Profiler = None,
+                    initial=None):
+    # fast engine with an instruction budget and a wall-clock limit checked between slices
+    # and before each block op; block ops count toward the budget by their length
+    deadline = time.monotonic() + time_limit if time_limit is not None else None
+    memory = PagedMemory(mem_size)
+    if isinstance(bytecode, Program) and bytecode.image is not None:
+        memory.load(bytecode.image)
+    if initial is not None:
+        memory.load(initial)
+    done = work = 0
+    for program in program_chunks(bytecode, slice_size):
+        if max_instructions is not None:
+            work += weight(program)
+            if work > max_instructions:
+                raise ExecutionLimitError(f"Program exceeds the limit of {max_instructions} instructions")
+        if deadline is not None and time.monotonic() > deadline:
+            raise ExecutionLimitError(f"Time limit of {time_limit:g}s exceeded after {done} instructions")
+        try:
+            if profiler is not None:
+                run_profiled(program, memory, profiler, done, deadline)
+            else:
+                run_predecoded(program, memory, deadline=deadline)
+        except _DeadlineExceeded:
+            raise ExecutionLimitError(f"Time limit of {time_limit:g}s exceeded after {done} instructions") from None
+        done += len(program[0])
+    return memory
+
+def _common_prefix(a: bytes, b: bytes) -> int:
+    # length of the common prefix, by binary search over slice comparisons
+    lo, hi = 0, min(len(a), len(b))
+    while lo < hi:
+        mid = (lo + hi + 1) // 2
+        if a[lo:mid] == b[lo:mid]:
+            lo = mid
+        else:
+            hi = mid - 1
+    return lo
+
+def run_with_checkpoints(bytecode, memory: PagedMemory, start_index: int = 0, start_offset: int = 0,
+                         interval: int = CHECKPOINT_INTERVAL, max_instructions: int = None,
+                         time_limit: float = None, base_image: dict = None, progress=None,
+                         checkpoints: list = None):
+    """Run bytecode from instruction start_index (at byte start_offset) on memory.
+
+    Returns [(index, offset, image)] snapshots taken every `interval`
+    instructions and at the end; pages unchanged since the previous snapshot
+    (or base_image) are shared rather than copied. progress(index, offset, total)
+    is called after every snapshot; an exception raised there aborts the run.
+    Snapshots are appended to `checkpoints` when given, so they survive an abort.
+
+    A Program with decoded columns (e.g. a ProgramIR) is sliced instead of
+    decoded; its offsets are instruction indices rather than byte offsets.
+    Block ops count toward max_instructions by their length (see weight).
+    """
+    deadline = time.monotonic() + time_limit if time_limit is not None else None
+    if checkpoints is None:
+        checkpoints = []
+    columns = None
+    if isinstance(bytecode, Program):
+        columns = bytecode.decoded
+        bytecode = bytecode.code
+    prev = base_image or {}
+    n = len(columns[0]) if columns is not None else len(bytecode)
+    index, pc = start_index, start_offset
+    work = start_index
+    if max_instructions is not None and columns is not None and start_index:
+        work = weight(tuple(col[:start_index] for col in columns))
+    while pc < n:
+        if deadline is not None and time.monotonic() > deadline:
+            raise ExecutionLimitError(f"Time limit of {time_limit:g}s exceeded after {index} instructions")
+        step = interval - index % interval
+        if columns is not None:
+            program = tuple(col[pc:pc + step] for col in columns)
+            pc += len(program[0])
+        else:
+            program, pc = _decode_range(bytecode, pc, step)
+        if max_instructions is not None:
+            work += weight(program)
+            if work > max_instructions:
+                raise ExecutionLimitError(f"Program exceeds the limit of {max_instructions} instructions")
+        try:
+            run_predecoded(program, memory, deadline=deadline)
+        except _DeadlineExceeded:
+            raise ExecutionLimitError(f"Time limit of {time_limit:g}s exceeded after {index} instructions") from None
+        index += len(program[0])
+        image = {}
+        for page_no, pg in memory.pages.items():
+            raw = pg.tobytes()
+            old = prev.get(page_no)
+            image[page_no] = old if old == raw else raw
+        checkpoints.append((index, pc, image))
+        prev = image
+        if progress is not None:
+            progress(index, pc, n)
+    return checkpoints
+
+class CheckpointExecutor:
+    """Re-runs edited programs from the nearest memory snapshot before the first change.
+
+    UVM programs are straight-line, so the memory state after instruction k
+    depends only on the bytes of instructions [0, k). Snapshots are taken every
+    `interval` instructions; when they exceed `budget_bytes`, every other one is
+    dropped and the interval doubles. The budget covers snapshots only, not
+    the private copy of the program.
+    """
+
+    def __init__(self, mem_size: int = ADDR_SPACE, interval: int = CHECKPOINT_INTERVAL,
+                 budget_bytes: int = CHECKPOINT_BUDGET):
+        self.mem_size = mem_size
+        self.interval = interval
+        self.budget_bytes = budget_bytes
+        self.bytecode = None
+        self.checkpoints = []
+        self.resumed_from = 0
+
+    def prepare(self, bytecode):
+        """Pick the resume point for bytecode: (start index, start offset, start image).
+
+        bytecode is a buffer, or a Program; one with decoded columns (such as
+        the assembler's ProgramIR) is compared column-wise and never encoded.
+        """
+        if isinstance(bytecode, Program) and bytecode.decoded is not None:
+            # a private copy, since the assembler splices its IR in place; a container's
+            # read-only views into its file are kept as they are
+            bytecode = Program(None, bytecode.count,
+                               decoded=tuple(col if isinstance(col, memoryview) else array(col.typecode, col)
+                                             for col in bytecode.decoded))
+        else:
+            bytecode = bytes(bytecode.code if isinstance(bytecode, Program) else bytecode)
+        start = (0, 0, {})
+        if self.bytecode is not None:
+            if isinstance(bytecode, Program) and isinstance(self.bytecode, Program):
+                diff = min(map(_common_prefix, self.bytecode.decoded, bytecode.decoded))
+            elif type(bytecode) is type(self.bytecode):
+                diff = _common_prefix(self.bytecode, bytecode)
+            else:
+                diff = 0
+            # the kept checkpoints only cover the prefix shared with the new bytecode
+            self.checkpoints = [cp for cp in self.checkpoints if cp[1] <= diff]
+            if self.checkpoints:
+                start = self.checkpoints[-1]
+        self.bytecode = bytecode
+        self.resumed_from = start[0]
+        return start
+
+    def commit(self, checkpoints):
+        last = self.checkpoints[-1][0] if self.checkpoints else 0
+        prev = self.checkpoints[-1][2] if self.checkpoints else {}
+        for index, offset, image in checkpoints:
+            if index <= last:
+                continue
+            # snapshots from a worker process come back as copies: share unchanged pages
+            # with the snapshot before them again, as run_with_checkpoints does in-process
+            shared = {}
+            for page_no, raw in image.items():
+                old = prev.get(page_no)
+                shared[page_no] = old if old == raw else raw
+            self.checkpoints.append((index, offset, shared))
+            prev = shared
+        while len(self.checkpoints) > 1 and self.snapshot_bytes() > self.budget_bytes:
+            if len(self.checkpoints) > 2:
+                # keep the last snapshot (end state) and every other one before it
+                self.checkpoints = self.checkpoints[-2::-2][::-1] + self.checkpoints[-1:]
+                self.interval *= 2
+            else:
+                # halving would keep both; only the end state is left to keep
+                del self.checkpoints[0]
+
+    def snapshot_bytes(self) -> int:
+        seen = {}
+        for _, _, image in self.checkpoints:
+            for raw in image.values():
+                seen[id(raw)] = len(raw)
+        return sum(seen.values())
+
+    def nbytes(self) -> int:
+        if isinstance(self.bytecode, Program):
+            code_bytes = sum(col.itemsize * len(col) for col in self.bytecode.decoded)
+        else:
+            code_bytes = len(self.bytecode) if self.bytecode is not None else 0
+        return self.snapshot_bytes() + code_bytes
+
+    def run(self, bytecode, max_instructions: int = None, time_limit: float = None, progress=None):
+        index, offset, image = self.prepare(bytecode)
+        memory = PagedMemory.from_image(image, self.mem_size)
+        checkpoints = []
+        try:
+            run_with_checkpoints(self.bytecode, memory, index, offset, self.interval,
+                                 max_instructions, time_limit, image, progress, checkpoints)
+        finally:
+            # snapshots taken before a limit error or a cancel are still valid
+            self.commit(checkpoints)
+        return memory
+
+def execute_reference(bytecode: bytes, mem_size: int = ADDR_SPACE, initial=None):
+    memory = PagedMemory(mem_size)
+    if isinstance(bytecode, Program):
+        if bytecode.image is not None:
+            memory.load(bytecode.image)
+        bytecode = bytecode.code
+    if initial is not None:
+        memory.load(initial)
     pc = 0
     while pc < len(bytecode):
         cmd, size = decode_command(bytecode, pc)
@@ -84,6 +591,20 @@ def execute(bytecode: bytes, mem_size: int = 4096):
             val2 = memory[cmd['D']]
             memory[cmd['B']] = val1 if val1 < val2 else val2
 
+        elif cmd['op'] == 'vmin':
+            vals = [min(memory[cmd['B'] + i], memory[cmd['C'] + i]) for i in range(cmd['D'])]
+            for i, val in enumerate(vals):
+                memory[cmd['B'] + i] = val
+
+        elif cmd['op'] == 'vcopy':
+            vals = [memory[cmd['C'] + i] for i in range(cmd['D'])]
+            for i, val in enumerate(vals):
+                memory[cmd['B'] + i] = val
+
+        elif cmd['op'] == 'vfill':
+            for i in range(cmd['D']):
+                memory[cmd['B'] + i] = cmd['C']
+
         pc += size
 
     return memory
@@ -92,25 +613,158 @@ def parse_range(rng: str):
     a,b = rng.split('-')
     return int(a), int(b)
 
+def write_dump(path: str, memory: PagedMemory, start: int, end: int):
+    with open(path,'w') as out:
+        out.write("addr,value\n")
+        for addr, val in memory.dump(start, end):
+            out.write(f"{addr},{val}\n")
+
+def read_golden(path: str):
+    # golden CSV -> (addrs, values) as int64 arrays
+    addrs = array('q')
+    values = array('q')
+    with open(path) as f:
+        next(f, None)
+        for line in f:
+            line = line.strip()
+            if line:
+                a, v = line.split(',')
+                addrs.append(int(a))
+                values.append(int(v))
+    return addrs, values
+
+def compare_golden(memory: PagedMemory, addrs, values, max_report: int = 5):
+    # returns a list of (addr, expected, actual) for up to max_report mismatches
+    n = len(addrs)
+    if n and addrs[-1] - addrs[0] == n - 1 and list(addrs) == list(range(addrs[0], addrs[-1] + 1)):
+        actual = array('q', memory[addrs[0]:addrs[-1] + 1])
+        if actual == values:
+            return []
+    else:
+        actual = array('q', (memory[a] for a in addrs))
+    return [(a, e, v) for a, e, v in zip(addrs, values, actual) if e != v][:max_report]
+
+def find_golden(golden_dir: str, stem: str):
+    # only names derived from the whole stem: a guess could compare against another program's dump
+    for name in (f"{stem}.csv", f"{stem}_dump.csv"):
+        path = os.path.join(golden_dir, name)
+        if os.path.isfile(path):
+            return path
+    return None
+
+def batch_inputs(pattern: str):
+    if os.path.isdir(pattern):
+        pattern = os.path.join(pattern, '*.bin')
+    return sorted(glob.glob(pattern))
+
+def run_batch_item(path: str, out_dir: str, rng, golden_dir, engine: str = 'fast'):
+    stem = os.path.splitext(os.path.basename(path))[0]
+    result = {'name': stem, 'status': 'ok', 'instructions': 0, 'seconds': 0.0, 'mismatches': []}
+    golden = find_golden(golden_dir, stem) if golden_dir else None
+    try:
+        data = open_program(path)
+        started = time.perf_counter()
+        if engine == 'fast':
+            memory = PagedMemory()
+            if data.image is not None:
+                memory.load(data.image)
+            for program in program_chunks(data):
+                run_predecoded(program, memory)
+                result['instructions'] += len(program[0])
+        else:
+            memory = execute(data, engine=engine)
+            # a container header has the count; only raw files need a scan
+            result['instructions'] = data.count if data.count is not None else len(scan(data.code)[0])
+        result['seconds'] = time.perf_counter() - started
+
+        expected = read_golden(golden) if golden else None
+        if rng is not None:
+            start, end = rng
+        elif expected is not None and len(expected[0]):
+            start, end = expected[0][0], expected[0][-1]
+        else:
+            start, end = 0, 127
+        if out_dir:
+            write_dump(os.path.join(out_dir, stem + '.csv'), memory, start, end)
+
+        if golden_dir:
+            if expected is None:
+                result['status'] = 'no golden'
+            else:
+                result['mismatches'] = compare_golden(memory, *expected)
+                result['status'] = 'FAIL' if result['mismatches'] else 'PASS'
+    except Exception as ex:
+        result['status'] = 'ERROR'
+        result['error'] = f"{type(ex).__name__}: {ex}"
+    return result
+
+def run_batch(paths, out_dir, rng, golden_dir, jobs: int = None, engine: str = 'fast'):
+    if out_dir:
+        os.makedirs(out_dir, exist_ok=True)
+    n = len(paths)
+    with ProcessPoolExecutor(max_workers=jobs) as pool:
+        return list(pool.map(run_batch_item, paths, [out_dir]*n, [rng]*n, [golden_dir]*n, [engine]*n))
+
+def print_batch_summary(results):
+    for r in results:
+        line = f"{r['status']:<9} {r['name']:<24} {r['instructions']:>10} instr {r['seconds']*1000:>9.2f} ms"
+        if 'error' in r:
+            line += f"  {r['error']}"
+        print(line)
+        for addr, exp, act in r['mismatches']:
+            print(f"          addr {addr}: expected {exp}, got {act}")
+    counts = {}
+    for r in results:
+        counts[r['status']] = counts.get(r['status'], 0) + 1
+    total_time = sum(r['seconds'] for r in results)
+    print(f"{len(results)} programs, " + ", ".join(f"{k}: {v}" for k, v in sorted(counts.items()))
+          + f"; total execution {total_time*1000:.2f} ms")
+
 def main():
     parser = argparse.ArgumentParser()
-    parser.add_argument('-i','--input', required=True)
-    parser.add_argument('-o','--output', required=True)
-    parser.add_argument('-r','--range', required=True)
+    parser.add_argument('-i','--input', required=True,
+                        help='.bin file; with --batch a directory or glob of .bin files')
+    parser.add_argument('-o','--output',
+                        help='dump CSV; with --batch an output directory (optional)')
+    parser.add_argument('-r','--range')
+    parser.add_argument('-e','--engine', choices=ENGINES, default='fast')
+    parser.add_argument('-b','--batch', action='store_true')
+    parser.add_argument('-g','--golden', help='directory of golden dump CSVs to compare against')
+    parser.add_argument('-j','--jobs', type=int, default=None)
+    parser.add_argument('-p','--profile', action='store_true',
+                        help='print per-opcode counts/time and hot addresses')
+    parser.add_argument('--trace', type=int, default=0,
+                        help='with --profile, keep the last N executed instructions')
+    parser.add_argument('--image',
+                        help='addr,value CSV preloaded into memory (e.g. from uvm_asm -O --image)')
     args = parser.parse_args()
 
-    with open(args.input,'rb') as f:
-        data = f.read()
+    if args.batch:
+        paths = batch_inputs(args.input)
+        if not paths:
+            parser.error(f"no .bin files match {args.input}")
+        rng = parse_range(args.range) if args.range else None
+        results = run_batch(paths, args.output, rng, args.golden, args.jobs, args.engine)
+        print_batch_summary(results)
+        if any(r['status'] in ('FAIL', 'ERROR') for r in results):
+            sys.exit(1)
+        return
+
+    if not args.output or not args.range:
+        parser.error("-o/--output and -r/--range are required")
 
-    memory = execute(data)
+    data = open_program(args.input)
+
+    profiler = Profiler(args.trace) if args.profile else None
+    initial = zip(*read_golden(args.image)) if args.image else None
+    memory = execute(data, engine=args.engine, profiler=profiler, initial=initial)
 
     start,end = parse_range(args.range)
-    with open(args.output,'w') as out:
-        out.write("addr,value\n")
-        for i in range(start, end+1):
-            out.write(f"{i},{memory[i]}\n")
+    write_dump(args.output, memory, start, end)
 
     print("Dump written to", args.output)
+    if profiler is not None:
+        print(profiler.format_report())
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,161 @@
+# uvm_memory.py - sparse paged memory for the UVM
+import sys
+from array import array
+from itertools import repeat
+
+ADDR_BITS = 21
+ADDR_SPACE = 1 << ADDR_BITS
+PAGE_BITS = 12
+PAGE_SIZE = 1 << PAGE_BITS
+PAGE_MASK = PAGE_SIZE - 1
+
+WORD_BYTES = array('q').itemsize
+
+_ZERO_PAGE = bytes(PAGE_SIZE * WORD_BYTES)
+
+
+class PagedMemory:
+    """Word-addressed memory that allocates fixed-size pages on first write.
+
+    Reads of untouched addresses return 0 without allocating anything, so
+    memory use grows with the pages a program writes, not with the address
+    width.
+    """
+
+    def __init__(self, size: int = ADDR_SPACE):
+        if not 0 < size <= ADDR_SPACE:
+            raise ValueError(f"Memory size must be in 1..{ADDR_SPACE}")
+        self.size = size
+        self.pages = {}
+
+    def __len__(self):
+        return self.size
+
+    def _check(self, addr: int):
+        if not 0 <= addr < self.size:
+            raise IndexError(f"Memory address {addr} out of range")
+
+    def page(self, n: int):
+        pg = self.pages.get(n)
+        if pg is None:
+            pg = self.pages[n] = array('q', _ZERO_PAGE)
+        return pg
+
+    def __getitem__(self, key):
+        if isinstance(key, slice):
+            start, stop, step = key.indices(self.size)
+            if step != 1:
+                return [self[a] for a in range(start, stop, step)]
+            return [v for _, v in self.dump(start, stop - 1)]
+        self._check(key)
+        pg = self.pages.get(key >> PAGE_BITS)
+        return pg[key & PAGE_MASK] if pg is not None else 0
+
+    def __setitem__(self, addr: int, value: int):
+        self._check(addr)
+        self.page(addr >> PAGE_BITS)[addr & PAGE_MASK] = value
+
+    def _check_block(self, start: int, n: int):
+        if n and not (0 <= start and start + n <= self.size):
+            raise IndexError(f"Memory block {start}..{start + n - 1} out of range")
+
+    def _spans(self, start: int, n: int):
+        # (page number, first index in page, last index + 1 in page, offset into the block)
+        addr, end = start, start + n
+        while addr < end:
+            pn = addr >> PAGE_BITS
+            stop = min(end, (pn + 1) << PAGE_BITS)
+            yield pn, addr & PAGE_MASK, (addr & PAGE_MASK) + stop - addr, addr - start
+            addr = stop
+
+    def read_block(self, start: int, n: int) -> array:
+        # values of start..start+n-1 as one array, copied page by page
+        self._check_block(start, n)
+        out = array('q')
+        for pn, lo, hi, _ in self._spans(start, n):
+            pg = self.pages.get(pn)
+            out.extend(pg[lo:hi] if pg is not None else array('q', _ZERO_PAGE[:(hi - lo) * WORD_BYTES]))
+        return out
+
+    def write_block(self, start: int, values: array):
+        # store an array('q') at start.., one slice assignment per page
+        self._check_block(start, len(values))
+        for pn, lo, hi, i in self._spans(start, len(values)):
+            self.page(pn)[lo:hi] = values[i:i + hi - lo]
+
+    def fill(self, start: int, n: int, value: int):
+        self._check_block(start, n)
+        for pn, lo, hi, _ in self._spans(start, n):
+            self.page(pn)[lo:hi] = array('q', [value]) * (hi - lo)
+
+    def load(self, items):
+        # write (addr, value) pairs, e.g. a precomputed image from uvm_opt
+        for addr, value in items:
+            self[addr] = value
+
+    def touched_pages(self):
+        for n in sorted(self.pages):
+            yield n << PAGE_BITS, self.pages[n]
+
+    def dump(self, start: int, end: int):
+        # (addr, value) for start..end inclusive, clamped to the address space
+        start = max(start, 0)
+        end = min(end, self.size - 1)
+        addr = start
+        while addr <= end:
+            n = addr >> PAGE_BITS
+            stop = min(end + 1, (n + 1) << PAGE_BITS)
+            pg = self.pages.get(n)
+            if pg is None:
+                yield from zip(range(addr, stop), repeat(0))
+            else:
+                base = n << PAGE_BITS
+                yield from zip(range(addr, stop), pg[addr - base:stop - base])
+            addr = stop
+
+    def nonzero(self, start: int = 0, end: int = None):
+        # non-zero (addr, value) pairs in start..end, visiting touched pages only
+        end = self.size - 1 if end is None else end
+        for base, pg in self.touched_pages():
+            if base + PAGE_SIZE <= start or base > end:
+                continue
+            lo = max(start - base, 0)
+            hi = min(end - base + 1, PAGE_SIZE)
+            for i, v in enumerate(pg[lo:hi], base + lo):
+                if v:
+                    yield i, v
+
+    def dump_bytes(self, start: int, end: int):
+        # raw little-endian int64 values for start..end, one chunk per page
+        start = max(start, 0)
+        end = min(end, self.size - 1)
+        addr = start
+        while addr <= end:
+            n = addr >> PAGE_BITS
+            stop = min(end + 1, (n + 1) << PAGE_BITS)
+            pg = self.pages.get(n)
+            if pg is None:
+                yield _ZERO_PAGE[:(stop - addr) * WORD_BYTES]
+            else:
+                base = n << PAGE_BITS
+                chunk = pg[addr - base:stop - base]
+                if sys.byteorder != 'little':
+                    chunk.byteswap()
+                yield chunk.tobytes()
+            addr = stop
+
+    def bytes_used(self) -> int:
+        return len(self.pages) * PAGE_SIZE * WORD_BYTES
+
+    def to_image(self) -> dict:
+        # {page number: raw page bytes} for touched pages only
+        return {n: pg.tobytes() for n, pg in self.pages.items()}
+
+    @classmethod
+    def from_image(cls, image: dict, size: int = ADDR_SPACE):
+        memory = cls(size)
+        for n, raw in image.items():
+            pg = array('q')
+            pg.frombytes(raw)
+            memory.pages[n] = pg
+        return memory
@@ -0,0 +1,109 @@
+# uvm_opt.py - assemble-time partial evaluation of UVM programs
+#
+# The ISA has no branches and every address is static (write_value stores to
+# C + D), so a program starting from known memory can be evaluated entirely at
+# assemble time. fold_ir does constant propagation over the IR and keeps only
+# the final value of each address, which drops every dead store; materialize
+# turns that image back into the shortest straight-line program.
+
+M7 = (1<<7)-1
+M21 = (1<<21)-1
+M26 = (1<<26)-1
+M16 = (1<<16)-1
+
+# largest address reachable by write_value (C + D, both 7-bit)
+MAX_STORE_ADDR = 2*M7
+
+
+def fold_ir(IR, initial=None):
+    """Evaluate (instr, args) pairs; returns the final non-zero memory as {addr: value}.
+
+    Operands are masked exactly like the pack_* encoders, so the result matches
+    executing the assembled bytecode.
+    """
+    mem = dict(initial or {})
+    get = mem.get
+    for instr, args in IR:
+        if instr == 'load_const':
+            B, C = args
+            mem[B & M7] = C & M26
+        elif instr == 'read_value':
+            B, C = args
+            mem[B & M7] = get(C & M21, 0)
+        elif instr == 'write_value':
+            B, C, D = args
+            mem[(C & M7) + (D & M7)] = get(B & M7, 0)
+        elif instr == 'min':
+            B, C, D = args
+            val1 = get(C & M7, 0)
+            val2 = get(D & M21, 0)
+            mem[B & M7] = val1 if val1 < val2 else val2
+        elif instr in ('vmin', 'vcopy', 'vfill'):
+            B, C, D = args[0] & M21, args[1] & M21, args[2] & M16
+            if instr == 'vfill':
+                vals = [C] * D
+            elif instr == 'vcopy':
+                vals = [get(C + i, 0) for i in range(D)]
+            else:
+                vals = [min(get(B + i, 0), get(C + i, 0)) for i in range(D)]
+            for i, val in enumerate(vals):
+                mem[B + i] = val
+        else:
+            raise ValueError("Unknown instruction: " + instr)
+    return {addr: val for addr, val in mem.items() if val}
+
+
+def materialize(image, temp=0):
+    """Shortest IR that produces `image` from zeroed memory.
+
+    Runs of two or more consecutive addresses holding the same value up to
+    21 bits become one vfill, as does any such single value that load_const
+    cannot reach. Other addresses above 127 are written through the `temp`
+    cell first (write_value up to 254, vcopy beyond); the remaining low
+    addresses, including the final value of `temp`, are loaded afterwards.
+    """
+    for addr, val in image.items():
+        if not 0 <= addr <= M21 or not 0 <= val <= M26:
+            raise ValueError(f"Cannot materialize memory[{addr}] = {val}")
+    fills, high, low = [], [], []
+    addrs = sorted(image)
+    i = 0
+    while i < len(addrs):
+        addr, val = addrs[i], image[addrs[i]]
+        j = i + 1
+        while (j < len(addrs) and j - i < M16 and addrs[j] == addr + j - i
+               and image[addrs[j]] == val):
+            j += 1
+        if val <= M21 and (j - i > 1 or addr > M7):
+            fills.append(('vfill', [addr, val, j - i]))
+        else:
+            j = i + 1
+            (high if addr > M7 else low).append(addr)
+        i = j
+
+    IR = []
+    for addr in high:
+        IR.append(('load_const', [temp, image[addr]]))
+        if addr <= MAX_STORE_ADDR:
+            C = min(addr, M7)
+            IR.append(('write_value', [temp, C, addr - C]))
+        else:
+            IR.append(('vcopy', [addr, temp, 1]))
+    if high and temp not in image:
+        IR.append(('load_const', [temp, 0]))
+    IR.extend(fills)
+    for addr in low:
+        IR.append(('load_const', [addr, image[addr]]))
+    return IR
+
+
+def optimize_ir(IR, initial=None):
+    return materialize(fold_ir(IR, initial))
+
+
+def write_image(path, image):
+    # same addr,value CSV layout as memory dumps, non-zero cells only
+    with open(path, 'w') as out:
+        out.write("addr,value\n")
+        for addr in sorted(image):
+            out.write(f"{addr},{image[addr]}\n")
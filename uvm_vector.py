@@ -0,0 +1,302 @@
+# uvm_vector.py - NumPy execution of independent instruction runs
+#
+# Every UVM address is an immediate, so the read and write set of each
+# instruction is known after decoding. A run of same-opcode instructions in
+# which no instruction reads or rewrites an address written earlier in the run
+# behaves exactly like "gather all sources, then scatter all results", which
+# is one NumPy fancy-indexing operation. Block instructions (vmin, vcopy,
+# vfill) cover address ranges and always run alone, as one slice operation.
+from array import array
+
+from uvm_interp import (ADDR_SPACE, BLOCK_OPS, OP_LOAD_CONST, OP_MIN, OP_VCOPY, OP_VFILL, OP_VMIN,
+                        OP_WRITE, PagedMemory, Program, program_chunks)
+from uvm_memory import PAGE_BITS, PAGE_SIZE
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+# runs shorter than this are applied with scalar indexing
+MIN_VECTOR_RUN = 4
+
+
+def _require_numpy():
+    if np is None:
+        raise RuntimeError("NumPy is required for vectorized execution (pip install numpy)")
+
+
+def operands(program):
+    """Columns (ops, dst, src1, src2, const, length) for a decoded program.
+
+    -1 marks an unused source. Block instructions have length D and start
+    addresses in dst/src1 (vmin also reads its dst range); every other
+    instruction has length 1.
+    """
+    _require_numpy()
+    ops, bs, cs, ds = (np.asarray(col, dtype=np.int64) for col in program)
+    write = ops == OP_WRITE
+    block = np.isin(ops, BLOCK_OPS)
+    dst = np.where(write, cs + ds, bs)
+    src1 = np.where(write, bs, np.where((ops == OP_LOAD_CONST) | (ops == OP_VFILL), -1, cs))
+    src2 = np.where(ops == OP_MIN, ds, -1)
+    length = np.where(block, ds, 1)
+    return ops, dst, src1, src2, cs, length
+
+
+def _accesses(op, d, s1, s2, n):
+    # (addresses read, addresses written) by one instruction
+    if op in BLOCK_OPS:
+        reads = list(range(s1, s1 + n)) if op != OP_VFILL else []
+        if op == OP_VMIN:
+            reads.extend(range(d, d + n))
+        return reads, range(d, d + n)
+    return [s for s in (s1, s2) if s >= 0], (d,)
+
+
+def _last_address(dst, src1, src2, length):
+    # same as uvm_interp.max_address, from operand columns; empty blocks touch nothing
+    live = length > 0
+    hi = max(src2.max(), (dst[live] + length[live] - 1).max(initial=-1))
+    used = live & (src1 >= 0)
+    return max(hi, (src1[used] + length[used] - 1).max(initial=-1))
+
+
+def dependency_graph(program):
+    """For each instruction, the indices of earlier instructions it must follow.
+
+    Edges cover read-after-write, write-after-write and write-after-read on
+    the same address; instructions with no path between them may run in any
+    order.
+    """
+    ops, dst, src1, src2, _, length = operands(program)
+    last_write = {}
+    readers = {}
+    graph = []
+    for i, args in enumerate(zip(ops.tolist(), dst.tolist(), src1.tolist(), src2.tolist(),
+                                 length.tolist())):
+        reads, writes = _accesses(*args)
+        deps = set()
+        for s in reads:
+            if s in last_write:
+                deps.add(last_write[s])
+        for d in writes:
+            if d in last_write:
+                deps.add(last_write[d])
+            deps.update(readers.pop(d, ()))
+        for s in reads:
+            readers.setdefault(s, []).append(i)
+        for d in writes:
+            last_write[d] = i
+        deps.discard(i)
+        graph.append(tuple(sorted(deps)))
+    return graph
+
+
+def independent_runs(ops, dst, src1, src2):
+    """Split the program into maximal (opcode, start, stop) runs safe to vectorize.
+
+    A run ends at an opcode change, at a read of an address the run already
+    wrote (read-after-write) or at a second write to one address; reads of
+    addresses written later in the run are fine since all gathers happen first.
+    Block instructions are always runs of their own.
+    """
+    runs = []
+    cur = None
+    start = 0
+    written = set()
+    add = written.add
+    for i, (op, d, s1, s2) in enumerate(zip(ops.tolist(), dst.tolist(), src1.tolist(), src2.tolist())):
+        if op != cur or op in BLOCK_OPS or d in written or s1 in written or s2 in written:
+            if cur is not None:
+                runs.append((cur, start, i))
+            cur, start = op, i
+            written.clear()
+        add(d)
+    if cur is not None:
+        runs.append((cur, start, len(ops)))
+    return runs
+
+
+def apply_runs(mem, runs, dst, src1, src2, const, length):
+    """Apply runs to mem, indexed by address along axis 0 (extra axes are lanes)."""
+    lanes = (1,) * (mem.ndim - 1)
+    minimum = np.minimum if lanes else min
+    # scalar indexing is faster with Python ints than with NumPy scalars
+    dl, s1l, s2l, cl = dst.tolist(), src1.tolist(), src2.tolist(), const.tolist()
+    for op, s, e in runs:
+        if op in BLOCK_OPS:
+            d, n = dl[s], int(length[s])
+            if op == OP_VFILL:
+                mem[d:d + n] = cl[s]
+            elif op == OP_VCOPY:
+                mem[d:d + n] = mem[s1l[s]:s1l[s] + n].copy()
+            else:
+                mem[d:d + n] = np.minimum(mem[d:d + n], mem[s1l[s]:s1l[s] + n])
+        elif e - s < MIN_VECTOR_RUN:
+            for i in range(s, e):
+                if op == OP_LOAD_CONST:
+                    mem[dl[i]] = cl[i]
+                elif op == OP_MIN:
+                    mem[dl[i]] = minimum(mem[s1l[i]], mem[s2l[i]])
+                else:
+                    mem[dl[i]] = mem[s1l[i]]
+        elif op == OP_LOAD_CONST:
+            mem[dst[s:e]] = const[s:e].reshape((-1,) + lanes)
+        elif op == OP_MIN:
+            mem[dst[s:e]] = np.minimum(mem[src1[s:e]], mem[src2[s:e]])
+        else:
+            mem[dst[s:e]] = mem[src1[s:e]]
+
+
+def execute_vectorized(bytecode, mem_size: int = ADDR_SPACE, initial=None):
+    """Run bytecode with runs of independent instructions as NumPy operations.
+
+    Accepts the same inputs as uvm_interp.execute and returns a PagedMemory
+    with the same values and touched pages as the reference engine.
+    """
+    _require_numpy()
+    # whole pages, so the result converts to PagedMemory pages without padding
+    mem = np.zeros(-(-mem_size // PAGE_SIZE) * PAGE_SIZE, dtype=np.int64)
+    touched = set()
+    for image in ((bytecode.image if isinstance(bytecode, Program) else None), initial):
+        for addr, value in image or ():
+            if not 0 <= addr < mem_size:
+                raise IndexError(f"Memory address {addr} out of range")
+            mem[addr] = value
+            touched.add(addr >> PAGE_BITS)
+
+    for program in program_chunks(bytecode):
+        ops, dst, src1, src2, const, length = operands(program)
+        # checked even for the full address space: block ranges can run past its end,
+        # where NumPy slices would silently stop short
+        if len(ops) and _last_address(dst, src1, src2, length) >= mem_size:
+            raise IndexError(f"Program addresses exceed memory size {mem_size}")
+        apply_runs(mem, independent_runs(ops, dst, src1, src2), dst, src1, src2, const, length)
+        block = np.isin(ops, BLOCK_OPS)
+        touched.update(np.unique(dst[~block] >> PAGE_BITS).tolist())
+        for d, n in zip(dst[block].tolist(), length[block].tolist()):
+            if n:
+                touched.update(range(d >> PAGE_BITS, ((d + n - 1) >> PAGE_BITS) + 1))
+
+    memory = PagedMemory(mem_size)
+    for n in touched:
+        memory.pages[n] = array('q', mem[n << PAGE_BITS:(n + 1) << PAGE_BITS].tobytes())
+    return memory
+
+
+class LaneMemory:
+    """Final memory of every lane; only addresses the program or inputs touch are stored.
+
+    `values` is indexed [address slot, lane]; dump() returns the usual
+    lanes x addresses view.
+    """
+
+    def __init__(self, addresses, values):
+        self.addresses = addresses
+        self.values = values
+
+    @property
+    def lanes(self) -> int:
+        return self.values.shape[1]
+
+    def dump(self, start: int, end: int):
+        # lanes x (end - start + 1) array for addresses start..end inclusive
+        want = np.arange(start, end + 1)
+        slot = np.minimum(np.searchsorted(self.addresses, want), max(len(self.addresses) - 1, 0))
+        found = self.addresses[slot] == want if len(self.addresses) else np.zeros(len(want), bool)
+        out = np.zeros((self.lanes, len(want)), dtype=np.int64)
+        out[:, found] = self.values[slot[found]].T
+        return out
+
+
+def execute_lanes(bytecode, inputs, base: int = 0, mem_size: int = ADDR_SPACE):
+    """Run one program over many initial memory states at once.
+
+    inputs is a lanes x k array; lane i starts with inputs[i, j] at address
+    base + j (and the container image, if any). Every instruction is applied
+    to all lanes with one row gather/scatter; runs of independent
+    instructions are grouped as in execute_vectorized.
+    """
+    _require_numpy()
+    inputs = np.atleast_2d(np.asarray(inputs, dtype=np.int64))
+    lanes, k = inputs.shape
+
+    chunks = [operands(program) for program in program_chunks(bytecode)]
+    ops, dst, src1, src2, const, length = (np.concatenate([c[i] for c in chunks]) if chunks
+                                           else np.zeros(0, dtype=np.int64) for i in range(6))
+    runs = independent_runs(ops, dst, src1, src2)
+
+    image = bytecode.image if isinstance(bytecode, Program) and bytecode.image is not None else []
+    image_addrs = np.array([a for a, _ in image], dtype=np.int64)
+    in_addrs = np.arange(base, base + k, dtype=np.int64)
+    # memory is compacted to the addresses that occur anywhere, mapped to dense slots;
+    # every address of a block range is kept so the range stays contiguous in slots
+    block = np.isin(ops, BLOCK_OPS)
+    ranges = [np.arange(a, a + n, dtype=np.int64)
+              for op, d, s, n in zip(ops[block].tolist(), dst[block].tolist(),
+                                     src1[block].tolist(), length[block].tolist())
+              for a in ((d,) if op == OP_VFILL else (d, s))]
+    scalar = ~block
+    used = np.unique(np.concatenate((dst[scalar], src1[scalar & (src1 >= 0)], src2[src2 >= 0],
+                                     image_addrs, in_addrs, *ranges)))
+    if len(used) and (used[0] < 0 or used[-1] >= mem_size):
+        raise IndexError(f"Program addresses exceed memory size {mem_size}")
+
+    def slots(addrs):
+        return np.searchsorted(used, np.maximum(addrs, 0))
+
+    mem = np.zeros((len(used), lanes), dtype=np.int64)
+    for addr, value in image:
+        mem[slots(np.int64(addr))] = value
+    mem[slots(in_addrs)] = inputs.T
+    apply_runs(mem, runs, slots(dst), slots(src1), slots(src2), const, length)
+    return LaneMemory(used, mem)
+
+
+def read_vectors(path: str):
+    # CSV, one lane per row; a non-numeric first row is taken as a header and skipped
+    rows = []
+    with open(path) as f:
+        for n, line in enumerate(f):
+            line = line.strip()
+            if not line:
+                continue
+            fields = line.split(',')
+            if n == 0 and not fields[0].strip().lstrip('-').isdigit():
+                continue
+            rows.append([int(v) for v in fields])
+    if len({len(r) for r in rows}) > 1:
+        raise ValueError(f"{path}: all rows must have the same number of values")
+    return np.array(rows, dtype=np.int64).reshape(len(rows), -1)
+
+
+def write_lanes(path: str, memory: LaneMemory, start: int, end: int):
+    table = memory.dump(start, end)
+    with open(path, 'w') as out:
+        out.write("lane," + ",".join(str(a) for a in range(start, end + 1)) + "\n")
+        for lane, row in enumerate(table.tolist()):
+            out.write(f"{lane}," + ",".join(map(str, row)) + "\n")
+
+
+def main():
+    import argparse
+    from uvm_interp import open_program, parse_range
+
+    parser = argparse.ArgumentParser(description="Run one UVM program over many input vectors")
+    parser.add_argument('-i','--input', required=True, help='.bin file')
+    parser.add_argument('-v','--vectors', required=True,
+                        help='CSV of input vectors, one lane per row')
+    parser.add_argument('-o','--output', required=True, help='CSV with one row per lane')
+    parser.add_argument('-r','--range', required=True)
+    parser.add_argument('--base', type=int, default=0,
+                        help='address of the first CSV column')
+    args = parser.parse_args()
+
+    memory = execute_lanes(open_program(args.input), read_vectors(args.vectors), args.base)
+    start, end = parse_range(args.range)
+    write_lanes(args.output, memory, start, end)
+    print(f"{memory.lanes} lanes written to", args.output)
+
+if __name__ == "__main__":
+    main()